@@ -2,29 +2,287 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
+from scipy.special import expit
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import seaborn as sns
 import numpy as np
 import os
+import io
+import copy
+import sys
+import json
+import time
+import subprocess
+import tempfile
+import threading
+import functools
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from passlib.context import CryptContext # For password hashing
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Parquet export is only offered when pyarrow is installed
+    pa = pq = None
 
 # --- Security Setup: Password Hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = 12 # bcrypt cost factor; stored hashes with a different cost are rehashed on the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+LOGIN_WORKERS = 2 # Threads that run bcrypt verification; caps the cores a burst of logins can take
+LOGIN_MAX_PENDING = 32 # Logins waiting or in progress before new attempts are turned away
+LOGIN_RATE_LIMIT = 5 # Login attempts allowed per username and per client IP within LOGIN_RATE_WINDOW
+LOGIN_RATE_WINDOW = 60.0 # Seconds
 
 # --- Database Setup ---
 DB_NAME = 'student_data.db' # SQLite database file name
-MODEL_PATH = 'student_performance_model.pkl' # Path to save the trained ML model
-
-def init_db():
-    """Initializes the SQLite database with students and users tables."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+MODEL_PATH = 'student_performance_model.pkl' # Legacy single-pickle model, only read when the registry has no versions
+MODEL_REGISTRY_DIR = 'model_registry' # Versioned model artifacts: versions/<version>/ plus a CURRENT pointer file
+STUDENT_CACHE_SIZE = 256 # Max number of recently viewed student rows kept in memory per process
+STUDENT_LOOKUP_SQL = "SELECT * FROM students WHERE student_id = ?" # Constant text so SQLite reuses the prepared statement
+CSV_CHUNK_SIZE = 50000 # Rows parsed and written per transaction when ingesting an uploaded CSV
+REQUIRED_COLUMNS = ['student_id', 'name', 'attendance', 'mid_term_marks', 'final_term_marks', 'previous_gpa']
+NUMERIC_COLUMNS = ['attendance', 'mid_term_marks', 'final_term_marks', 'previous_gpa']
+ANALYTICS_RANGES = { # Fixed histogram range per column; values outside fall into the first/last bin
+    'attendance': (0.0, 100.0),
+    'mid_term_marks': (0.0, 100.0),
+    'final_term_marks': (0.0, 100.0),
+    'previous_gpa': (0.0, 4.0),
+}
+ANALYTICS_BIN_COUNT = 10 # Number of equal-width histogram bins per column
+CHART_DPI = 150 # Resolution of the pre-rendered analytics chart images
+CHART_CACHE_ENTRIES = 8 # Number of data versions whose rendered charts are kept in memory
+SCATTER_MAX_POINTS = 20000 # Above this many students the attendance vs. final marks chart switches to large-data mode
+SCATTER_LARGE_MODE = 'density' # Large-data mode: 'density' (2D binned counts) or 'sample' (stratified sample)
+SCATTER_DENSITY_BINS = 50 # Bins per axis for the density view
+FULL_REFIT_EVERY = 10 # Incremental updates allowed before the next training job does a full refit
+FULL_REFIT_FRACTION = 0.2 # Full refit once rows changed since the last full refit exceed this fraction of the table
+INCREMENTAL_LEARNING_RATE = 0.01 # SGD step size (in standardized feature units) for incremental updates
+TRAINING_CHUNK_SIZE = 100000 # Rows read from SQLite per chunk when building the training arrays
+TEST_SPLIT_PERCENT = 20 # Share of students (by hashed student_id) held out for evaluation
+TRAINING_CACHE_DIR = None # Directory for a memory-mapped .npy cache of the training arrays; None disables it
+TRAINING_MAX_WORKERS = 1 # Max training jobs running at once in this server process
+TRAINING_JOB_FLAG = '--train-job' # Command-line flag that makes app.py run a single training job and exit
+STUDENT_PAGE_SIZE = 50 # Rows per page in the student browser
+BROWSER_RANGE_FILTERS = ['attendance', 'mid_term_marks', 'previous_gpa'] # Columns the student browser filters by range
+EXPORT_CHUNK_SIZE = 50000 # Students read, scored and written per chunk when exporting predictions
+EXPORT_DIR = 'exports' # Where prepared prediction exports wait to be downloaded
+EXPORT_MAX_AGE = 3600 # Seconds an export file is kept; older ones are deleted whenever a new export is prepared
+SQLITE_MAX_PARAMS = 900 # Max bound parameters per statement (stays below SQLite's oldest default limit of 999)
+DB_POOL_SIZE = 8 # Max number of idle connections kept open per process
+DB_BUSY_TIMEOUT = 10.0 # Seconds a connection waits on a locked database before raising
+SQLITE_PRAGMAS = [
+    ('journal_mode', 'WAL'), # Readers are not blocked by a writer (e.g. during a CSV upload)
+    ('synchronous', 'NORMAL'), # Safe with WAL and avoids an fsync on every commit
+    ('cache_size', -32000), # Negative value is in KiB, i.e. ~32 MB page cache per connection
+    ('mmap_size', 268435456), # Memory-map up to 256 MB of the database file for reads
+    ('temp_store', 'MEMORY'),
+]
+
+# --- Instrumentation ---
+PERF_SAMPLES_PER_SPAN = 1000 # Most recent durations kept per span for the p50/p95 figures
+PERF_LOG_PATH = None # JSON-lines file that every finished span is appended to; None disables the export
+
+class SpanStats:
+    """Thread-safe store of recent span durations, summarized as call counts and latency percentiles."""
+
+    def __init__(self, maxlen=PERF_SAMPLES_PER_SPAN):
+        self.maxlen = maxlen
+        self._samples = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.maxlen)
+                self._calls[name] = 0
+            self._samples[name].append(seconds)
+            self._calls[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+
+    def summary(self):
+        """Returns one row per span with its call count and p50/p95/max latency in milliseconds, slowest p95 first."""
+        with self._lock:
+            samples = {name: np.array(values) * 1000 for name, values in self._samples.items()}
+            calls = dict(self._calls)
+        rows = [{
+            'span': name,
+            'calls': calls[name],
+            'p50_ms': np.percentile(values, 50),
+            'p95_ms': np.percentile(values, 95),
+            'max_ms': values.max(),
+        } for name, values in samples.items()]
+        if not rows:
+            return pd.DataFrame(columns=['span', 'calls', 'p50_ms', 'p95_ms', 'max_ms'])
+        return pd.DataFrame(rows).sort_values('p95_ms', ascending=False, ignore_index=True)
+
+@st.cache_resource
+def _create_perf_stats():
+    """Creates the process-wide span statistics; use get_perf_stats to read them."""
+    return SpanStats()
+
+_process_perf_stats = None
+
+def get_perf_stats():
+    """
+    Returns the process-wide span statistics, shared by all sessions and reruns. Memoized in a module global,
+    since a cache_resource lookup costs more than recording a span. Every reader and writer goes through here,
+    so after Streamlit's "Clear cache" the panel, Reset and span() still share one object.
+    """
+    global _process_perf_stats
+    if _process_perf_stats is None:
+        _process_perf_stats = _create_perf_stats()
+    return _process_perf_stats
+
+def get_session_perf_stats():
+    """Returns this session's span statistics, or None outside a Streamlit session (worker threads, training jobs, scripts)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None
+    if 'perf_stats' not in st.session_state:
+        st.session_state.perf_stats = SpanStats()
+    return st.session_state.perf_stats
+
+_perf_log_lock = threading.Lock()
+
+def _export_span(name, seconds, ctx):
+    """Appends one finished span to PERF_LOG_PATH as a JSON line."""
+    record = {
+        'ts': time.time(),
+        'span': name,
+        'ms': round(seconds * 1000, 3),
+        'pid': os.getpid(),
+        'session': ctx.session_id if ctx is not None else None,
+    }
+    with _perf_log_lock, open(PERF_LOG_PATH, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+@contextmanager
+def span(name):
+    """Times the with-block and records it under name in the process and session statistics (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        get_perf_stats().record(name, seconds)
+        session_stats = get_session_perf_stats()
+        if session_stats is not None:
+            session_stats.record(name, seconds)
+        if PERF_LOG_PATH:
+            _export_span(name, seconds, get_script_run_ctx(suppress_warning=True))
+
+def timed(func):
+    """Decorator that records every call of func as a span named after the function."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+class ConnectionPool:
+    """A per-process pool of long-lived SQLite connections configured for WAL mode."""
+
+    def __init__(self, db_name, max_idle=DB_POOL_SIZE):
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'connections_created': 0,
+            'connections_reused': 0,
+            'write_transactions': 0,
+            'lock_wait_seconds': 0.0,
+            'max_lock_wait_seconds': 0.0,
+        }
+
+    def _connect(self):
+        """Opens a new connection and applies the tuning pragmas."""
+        # check_same_thread=False because Streamlit may run a session's reruns on different threads;
+        # the pool guarantees a connection is only used by one thread at a time.
+        conn = sqlite3.connect(self.db_name, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+        for pragma, value in SQLITE_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma}={value}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Checks out a connection for the duration of the with-block and returns it to the pool afterwards."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._stats['connections_reused' if conn is not None else 'connections_created'] += 1
+        if conn is None:
+            conn = self._connect()
 
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Checks out a connection holding the write lock; commits on success and rolls back on error."""
+        with self.connection() as conn:
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE") # Take the write lock up front so waiting is measured here
+            waited = time.perf_counter() - start
+            with self._lock:
+                self._stats['write_transactions'] += 1
+                self._stats['lock_wait_seconds'] += waited
+                self._stats['max_lock_wait_seconds'] = max(self._stats['max_lock_wait_seconds'], waited)
+            yield conn
+            conn.commit()
+
+    def metrics(self):
+        """Returns a snapshot of connection reuse and write lock wait statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle_connections'] = len(self._idle)
+        checkouts = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_ratio'] = stats['connections_reused'] / checkouts if checkouts else 0.0
+        return stats
+
+@st.cache_resource
+def get_connection_pool(db_name):
+    """Returns the process-wide connection pool for db_name, shared by all sessions and reruns."""
+    return ConnectionPool(db_name)
+
+def db_connection():
+    """Context manager yielding a pooled connection to DB_NAME for reads."""
+    return get_connection_pool(DB_NAME).connection()
+
+def db_transaction():
+    """Context manager yielding a pooled connection to DB_NAME inside a committed write transaction."""
+    return get_connection_pool(DB_NAME).transaction()
+
+DEFAULT_USERS = [
+    ('admin', 'adminpass', 'admin'),
+    ('teacher', 'teacherpass', 'teacher'),
+    ('student1', 'studentpass', 'student')
+]
+
+def _migration_base_tables(conn):
+    """Schema v1: students and users tables."""
     # Create students table if it doesn't exist
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS students (
             student_id TEXT PRIMARY KEY,
             name TEXT,
@@ -38,7 +296,7 @@ def init_db():
     ''')
 
     # Create users table for login system
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
             username TEXT PRIMARY KEY,
             password TEXT,
@@ -46,61 +304,601 @@ def init_db():
         )
     ''')
 
-    # Add some default users if they don't already exist
-    users_to_add = [
-        ('admin', get_password_hash('adminpass'), 'admin'),
-        ('teacher', get_password_hash('teacherpass'), 'teacher'),
-        ('student1', get_password_hash('studentpass'), 'student')
-    ]
-    for user_data in users_to_add:
-        try:
-            cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", user_data)
-        except sqlite3.IntegrityError:
-            pass # User already exists, skip insertion
+def _migration_predictions_table(conn):
+    """Schema v2: batch-scored predictions, one row per student per model version."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS predictions (
+            student_id TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            prediction INTEGER,
+            probability REAL,
+            risk_category TEXT,
+            scored_at REAL,
+            PRIMARY KEY (student_id, model_version)
+        )
+    ''')
 
-    conn.commit()
-    conn.close()
+def _migration_analytics_tables(conn):
+    """Schema v3: precomputed analytics aggregates, backfilled from the existing students."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_outcomes (
+            outcome INTEGER PRIMARY KEY,
+            students INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_histograms (
+            column_name TEXT NOT NULL,
+            bin INTEGER NOT NULL,
+            students INTEGER NOT NULL,
+            PRIMARY KEY (column_name, bin)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_stats (
+            column_name TEXT PRIMARY KEY,
+            n INTEGER NOT NULL,
+            total REAL NOT NULL,
+            total_sq REAL NOT NULL,
+            min_value REAL,
+            max_value REAL
+        )
+    ''')
+    rebuild_analytics(conn)
+
+def _migration_app_meta(conn):
+    """Schema v4: key/value metadata, starting with the data version bumped on every student data change."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 0)")
+
+def _migration_training_jobs(conn):
+    """Schema v5: background model training jobs with their status, timing and evaluation metrics."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS training_jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL, -- queued, running, succeeded, skipped, failed or cancelled
+            requested_by TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            pid INTEGER,
+            training_rows INTEGER,
+            accuracy REAL,
+            confusion_matrix TEXT, -- JSON encoded 2x2 matrix
+            classification_report TEXT,
+            error TEXT
+        )
+    ''')
 
+def _migration_row_versions(conn):
+    """Schema v6: per-row data version for change tracking, plus training mode and watermark bookkeeping."""
+    conn.execute("ALTER TABLE students ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_row_version ON students (row_version)")
+    conn.execute("ALTER TABLE training_jobs ADD COLUMN requested_mode TEXT NOT NULL DEFAULT 'auto'")
+    conn.execute("ALTER TABLE training_jobs ADD COLUMN mode TEXT")
+    # trained_through: highest row_version included in the published model (NULL until a job has trained one)
+    conn.executemany("INSERT OR IGNORE INTO app_meta (key, value) VALUES (?, ?)", [
+        ('trained_through', None),
+        ('rows_since_full_refit', 0),
+        ('updates_since_full_refit', 0),
+    ])
+
+def _migration_job_model_versions(conn):
+    """Schema v7: registry version published by each training job."""
+    conn.execute("ALTER TABLE training_jobs ADD COLUMN model_version TEXT")
+
+def _migration_browser_indexes(conn):
+    """Schema v8: indexes for the student browser's server-side filters."""
+    for col in ['attendance', 'mid_term_marks', 'previous_gpa', 'outcome']:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_students_{col} ON students ({col})")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_version_risk ON predictions (model_version, risk_category, student_id)")
+
+# Ordered schema migrations; the database's PRAGMA user_version records how many have been applied.
+# Append new migrations to the end and never reorder or edit ones that have shipped.
+SCHEMA_MIGRATIONS = [
+    _migration_base_tables,
+    _migration_predictions_table,
+    _migration_analytics_tables,
+    _migration_app_meta,
+    _migration_training_jobs,
+    _migration_row_versions,
+    _migration_job_model_versions,
+    _migration_browser_indexes,
+]
+
+def migrate_db(conn):
+    """Applies any pending schema migrations inside the caller's transaction and returns the schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for new_version, migration in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {new_version}")
+    return max(version, len(SCHEMA_MIGRATIONS))
+
+@timed
+def init_db():
+    """Initializes the SQLite database schema and default users. Safe to call repeatedly; returns the schema version."""
+    with db_transaction() as conn:
+        schema_version = migrate_db(conn)
+
+        # Add some default users if they don't already exist. Existence is checked first because
+        # bcrypt hashing is deliberately slow and should only be paid for users we actually insert.
+        for username, password, role in DEFAULT_USERS:
+            if conn.execute("SELECT 1 FROM users WHERE username=?", (username,)).fetchone() is None:
+                conn.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                             (username, get_password_hash(password), role))
+    return schema_version
+
+@st.cache_resource
+def bootstrap_db(db_name):
+    """Runs init_db once per process for db_name and returns startup timing information."""
+    start = time.perf_counter()
+    schema_version = init_db()
+    return {
+        'schema_version': schema_version,
+        'init_db_seconds': time.perf_counter() - start,
+        'initialized_at': time.time(),
+    }
+
+@timed
 def add_student_data(df):
-    """Adds or updates student data from a DataFrame to the database using INSERT OR REPLACE."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cols = ', '.join([f'"{col}"' for col in df.columns])
-    placeholders = ', '.join(['?'] * len(df.columns))
+    """
+    Upserts student data from a DataFrame and applies the change to the analytics aggregates in the same transaction.
+    Rows identical to what is stored are not written, so re-uploading a mostly unchanged roster only touches the
+    changed records. Returns the number of inserted, updated and unchanged students.
+    """
+    # student_id is TEXT in the table; compare and write it as text so integer IDs match the stored rows
+    df = df.assign(student_id=df['student_id'].astype(str))
+    # The last duplicate wins, as it would if the rows were written one after another
+    df = df.drop_duplicates(subset='student_id', keep='last')
+    data_columns = [col for col in df.columns if col != 'row_version']
+
+    with db_transaction() as conn:
+        previous_columns = list(dict.fromkeys(data_columns + _analytics_source_columns()))
+        previous_rows = _fetch_students_by_id(conn, df['student_id'].tolist(), previous_columns).set_index('student_id')
+
+        is_new = ~df['student_id'].isin(previous_rows.index).to_numpy()
+        existing = df[~is_new]
+        is_changed = _rows_differ(existing[data_columns].set_index('student_id'),
+                                  previous_rows.loc[existing['student_id'], [c for c in data_columns if c != 'student_id']])
+        changed = pd.concat([df[is_new], existing[is_changed]])
+        counts = {'inserted': int(is_new.sum()), 'updated': int(is_changed.sum()),
+                  'unchanged': int(len(existing) - is_changed.sum())}
+        if changed.empty:
+            return counts # Nothing to write: no new data version, so caches and the next training job are unaffected
+
+        # Every write gets the next data version; stamping it on the rows lets training find what changed since then
+        conn.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+        data_version = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()[0]
+        changed = changed[data_columns].assign(row_version=data_version)
+
+        cols = ', '.join([f'"{col}"' for col in changed.columns])
+        placeholders = ', '.join(['?'] * len(changed.columns))
+        updates = ', '.join([f'"{col}" = excluded."{col}"' for col in changed.columns if col != 'student_id'])
+        differs = ' OR '.join([f'students."{col}" IS NOT excluded."{col}"' for col in data_columns if col != 'student_id'])
+        # Unlike INSERT OR REPLACE, which deletes and re-inserts, an upsert updates the row in place and leaves
+        # columns missing from df as they were. The WHERE guard keeps identical rows (and their row_version) untouched.
+        sql = (f"INSERT INTO students ({cols}) VALUES ({placeholders}) "
+               f"ON CONFLICT(student_id) DO UPDATE SET {updates} WHERE {differs or '0'}")
+        # astype(object) turns NumPy scalars into Python ints/floats, which sqlite3 can bind (np.int64 would be stored as a BLOB)
+        rows = changed.astype(object).where(changed.notna(), None).itertuples(index=False, name=None)
+        conn.executemany(sql, rows)
+
+        # Only changed rows move the aggregates; analytics columns missing from df keep their stored values
+        removed_rows = previous_rows.loc[previous_rows.index.intersection(changed['student_id'])]
+        added_rows = changed.set_index('student_id')
+        for col in _analytics_source_columns()[1:]:
+            if col not in added_rows.columns:
+                added_rows[col] = previous_rows[col].reindex(added_rows.index)
+        update_analytics(conn, removed_rows.reset_index(), added_rows.reset_index())
+
+    # Only the changed rows may be stale in the cache
+    get_student_cache().invalidate(changed['student_id'].tolist())
+    return counts
+
+def _rows_differ(new_rows, stored_rows):
+    """
+    Compares two frames with the same index and columns row by row and returns a boolean array that is True where
+    any value differs. Two missing values count as equal, and numbers compare by value as SQLite's IS NOT does.
+    """
+    differs = np.zeros(len(new_rows), dtype=bool)
+    for col in new_rows.columns:
+        new, stored = new_rows[col], stored_rows[col]
+        if pd.api.types.is_numeric_dtype(new) and pd.api.types.is_numeric_dtype(stored):
+            same = new.to_numpy(dtype=float) == stored.to_numpy(dtype=float)
+        else:
+            same = new.astype(object).to_numpy() == stored.astype(object).to_numpy()
+        differs |= ~(same | (new.isna().to_numpy() & stored.isna().to_numpy()))
+    return differs
 
-    # Using INSERT OR REPLACE to handle duplicates based on the PRIMARY KEY (student_id)
-    sql = f"INSERT OR REPLACE INTO students ({cols}) VALUES ({placeholders})"
-    cursor.executemany(sql, df.to_records(index=False))
-    conn.commit()
-    conn.close()
+@timed
+def get_data_version():
+    """Returns a counter that increases whenever student data changes; used as a cache key for derived results."""
+    with db_connection() as conn:
+        return conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()[0]
 
+@timed
 def get_all_student_data():
     """Retrieves all student data from the database."""
-    conn = sqlite3.connect(DB_NAME)
-    df = pd.read_sql_query("SELECT * FROM students", conn)
-    conn.close()
+    with db_connection() as conn:
+        df = pd.read_sql_query("SELECT * FROM students", conn)
     return df
 
+class StudentCache:
+    """A small thread-safe LRU of recently viewed student rows, keyed by student_id."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0 # Bumped by every invalidate, so rows read before it can be recognised in put
+
+    def generation(self):
+        """Returns the current generation; read it before loading a row from the database and pass it to put."""
+        with self._lock:
+            return self._generation
+
+    def get(self, student_id):
+        """Returns a copy of the cached row for student_id, or None on a cache miss."""
+        with self._lock:
+            row = self._rows.get(student_id)
+            if row is None:
+                return None
+            self._rows.move_to_end(student_id)
+            return dict(row)
+
+    def put(self, student_id, row, generation):
+        """
+        Stores a row read during generation, evicting the least recently used entry when the cache is full.
+        The row is dropped if the cache was invalidated since, as it may predate the change.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._rows[student_id] = dict(row)
+            self._rows.move_to_end(student_id)
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+
+    def invalidate(self, student_ids=None):
+        """Drops the given student_ids from the cache, or everything if none are given."""
+        with self._lock:
+            self._generation += 1
+            if student_ids is None:
+                self._rows.clear()
+            else:
+                for student_id in student_ids:
+                    self._rows.pop(student_id, None)
+
+@st.cache_resource
+def get_student_cache():
+    """Returns the per-process student row cache, shared by all sessions and reruns."""
+    return StudentCache(STUDENT_CACHE_SIZE)
+
+@timed
+def get_student(student_id):
+    """Retrieves a single student's record as a dictionary using the student_id primary key, or None if not found."""
+    cache = get_student_cache()
+    student_data = cache.get(student_id)
+    if student_data is not None:
+        return student_data
+
+    generation = cache.generation()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row # Allows accessing columns by name without changing the pooled connection
+        record = cursor.execute(STUDENT_LOOKUP_SQL, (student_id,)).fetchone()
+
+    if record is None:
+        return None
+    student_data = dict(record)
+    # Empty cells are stored as NULL; NaN keeps numeric formatting and comparisons working, as in the DataFrame path
+    for col in NUMERIC_COLUMNS:
+        if student_data.get(col) is None:
+            student_data[col] = float('nan')
+    cache.put(student_id, student_data, generation)
+    return student_data
+
+@timed
 def get_user(username, password):
     """Authenticates a user based on username and password."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row # Allows accessing columns by name
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username=?", (username,))
-    user_record = cursor.fetchone()
-    conn.close()
-
-    # Verify password against the stored hash
-    if user_record and verify_password(password, user_record['password']):
-        return {'username': user_record['username'], 'role': user_record['role']}
-    return None
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row # Allows accessing columns by name
+        cursor.execute("SELECT * FROM users WHERE username=?", (username,))
+        user_record = cursor.fetchone()
+
+    if user_record is None:
+        return None
+
+    # Verify password against the stored hash, getting a new hash if the stored one uses outdated settings
+    verified, new_hash = pwd_context.verify_and_update(password, user_record['password'])
+    if not verified:
+        return None
+    if new_hash is not None:
+        with db_transaction() as conn:
+            conn.execute("UPDATE users SET password=? WHERE username=?", (new_hash, user_record['username']))
+    return {'username': user_record['username'], 'role': user_record['role'], 'rehashed': new_hash is not None}
+
+# --- Login Subsystem ---
+class RateLimiter:
+    """Sliding-window limiter allowing max_attempts per key within window seconds."""
+
+    def __init__(self, max_attempts, window):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._attempts = {} # key -> deque of attempt timestamps
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Records an attempt for key and returns False if the key has used up its attempts for the window."""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._attempts.setdefault(key, deque())
+            while attempts and now - attempts[0] > self.window:
+                attempts.popleft()
+            if len(attempts) >= self.max_attempts:
+                return False
+            attempts.append(now)
+            # Drop keys whose attempts have all expired so the table does not grow without bound
+            if len(self._attempts) > 10000:
+                self._attempts = {k: v for k, v in self._attempts.items() if v and now - v[-1] <= self.window}
+            return True
+
+class LoginService:
+    """
+    Authenticates users on a small bounded thread pool, so bursts of bcrypt verification cannot take every core from
+    sessions that are already logged in, and applies per-username and per-IP rate limits before doing any hashing.
+    """
 
-# --- Password Hashing Functions ---
-def verify_password(plain_password, hashed_password):
-    """Verifies a plain password against a hashed one."""
-    return pwd_context.verify(plain_password, hashed_password)
+    def __init__(self, workers=LOGIN_WORKERS, max_pending=LOGIN_MAX_PENDING):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="login")
+        self._limiter = RateLimiter(LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies = deque(maxlen=1000) # Seconds per completed verification, most recent last
+        self._counts = {'succeeded': 0, 'failed': 0, 'rate_limited': 0, 'rejected_busy': 0, 'rehashed': 0}
+
+    def authenticate(self, username, password, client_ip=None):
+        """Returns (user, error_message); user is None when the login was refused or the credentials were wrong."""
+        if not self._limiter.allow(('user', username)) or (client_ip and not self._limiter.allow(('ip', client_ip))):
+            self._count('rate_limited')
+            return None, "Too many login attempts. Please wait a minute and try again."
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counts['rejected_busy'] += 1
+                return None, "The server is busy handling other logins. Please try again in a moment."
+            self._pending += 1
+
+        start = time.perf_counter()
+        try:
+            user = self._executor.submit(get_user, username, password).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._latencies.append(time.perf_counter() - start)
+
+        if user is None:
+            self._count('failed')
+            return None, "Invalid username or password. Please try again."
+        self._count('succeeded')
+        if user.get('rehashed'):
+            self._count('rehashed')
+        return user, None
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def metrics(self):
+        """Returns login counts, current queue depth and p50/p95 verification latency in milliseconds."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            stats = dict(self._counts)
+            stats['queue_depth'] = self._pending
+        stats['latency_p50_ms'] = float(np.percentile(latencies, 50) * 1000) if len(latencies) else None
+        stats['latency_p95_ms'] = float(np.percentile(latencies, 95) * 1000) if len(latencies) else None
+        return stats
+
+@st.cache_resource
+def get_login_service():
+    """Returns the process-wide login service, shared by all sessions and reruns."""
+    return LoginService()
+
+# --- CSV Ingestion ---
+def _clean_student_chunk(chunk):
+    """Coerces numeric columns, derives 'outcome' and splits a raw CSV chunk into (valid rows, number of rejected rows)."""
+    chunk['student_id'] = chunk['student_id'].str.strip()
+    valid = chunk['student_id'].notna() & (chunk['student_id'] != '')
+    for col in NUMERIC_COLUMNS:
+        raw = chunk[col]
+        chunk[col] = pd.to_numeric(raw, errors='coerce')
+        # Empty cells are allowed (stored as NULL), but values that fail to parse reject the row
+        valid &= chunk[col].notna() | raw.isna()
+    # 'outcome' cannot be derived without final marks
+    valid &= chunk['final_term_marks'].notna()
+
+    cleaned = chunk.loc[valid, REQUIRED_COLUMNS].copy()
+    # For demo, define 'outcome': 1 if final_term_marks >= 60, else 0
+    cleaned[TARGET] = (cleaned['final_term_marks'] >= 60).astype(int)
+    return cleaned, int((~valid).sum())
+
+@timed
+def ingest_student_csv(csv_file, chunk_size=CSV_CHUNK_SIZE, progress_callback=None):
+    """
+    Streams a student CSV into the database chunk by chunk so peak memory depends on chunk_size, not file size.
+    Each chunk is validated and written in its own transaction. progress_callback, if given, is called after
+    every chunk with the running stats dictionary. Raises ValueError if required columns are missing.
+    """
+    header = pd.read_csv(csv_file, nrows=0).columns
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing_columns:
+        raise ValueError(f"The uploaded CSV must contain all required columns: {', '.join(REQUIRED_COLUMNS)}. Missing: {', '.join(missing_columns)}.")
+    csv_file.seek(0)
+
+    stats = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0, 'rows_inserted': 0, 'rows_updated': 0,
+             'rows_unchanged': 0, 'chunks': 0,
+             'seconds': 0.0, 'rows_per_second': 0.0, 'fraction_done': 0.0, 'preview': None}
+    total_bytes = getattr(csv_file, 'size', None)
+    start = time.perf_counter()
+    # Read every column as text and convert per chunk, so one malformed cell rejects a row instead of the whole file
+    reader = pd.read_csv(csv_file, usecols=REQUIRED_COLUMNS, dtype={col: str for col in REQUIRED_COLUMNS},
+                         chunksize=chunk_size)
+    for chunk in reader:
+        cleaned, rejected = _clean_student_chunk(chunk)
+        if not cleaned.empty:
+            counts = add_student_data(cleaned)
+            for key, count in counts.items():
+                stats[f'rows_{key}'] += count
+        if stats['preview'] is None:
+            stats['preview'] = cleaned.head()
+
+        stats['chunks'] += 1
+        stats['rows_read'] += len(chunk)
+        stats['rows_written'] += len(cleaned)
+        stats['rows_rejected'] += rejected
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_second'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] else 0.0
+        if total_bytes:
+            stats['fraction_done'] = min(csv_file.tell() / total_bytes, 1.0)
+        if progress_callback is not None:
+            progress_callback(stats)
+
+    stats['fraction_done'] = 1.0
+    return stats
+
+# --- Analytics Aggregates ---
+def _analytics_source_columns():
+    """Columns of the students table that feed the analytics aggregates."""
+    return ['student_id', TARGET] + list(ANALYTICS_RANGES)
+
+def _fetch_students_by_id(conn, student_ids, columns=None):
+    """Returns the stored columns (default: the analytics columns) for the given student_ids (only those that exist)."""
+    columns = columns or _analytics_source_columns()
+    cols = ', '.join([f'"{col}"' for col in columns])
+    frames = []
+    for i in range(0, len(student_ids), SQLITE_MAX_PARAMS):
+        batch = student_ids[i:i + SQLITE_MAX_PARAMS]
+        placeholders = ', '.join(['?'] * len(batch))
+        frames.append(pd.read_sql_query(f"SELECT {cols} FROM students WHERE student_id IN ({placeholders})", conn, params=batch))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+def _numeric_values(df, col):
+    """Returns a column as a float array; a column missing from df counts as all NULL."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+def _histogram_counts(values, col):
+    """Counts non-missing values into the fixed ANALYTICS_BIN_COUNT bins for col."""
+    low, high = ANALYTICS_RANGES[col]
+    values = values[~np.isnan(values)]
+    bins = np.floor((values - low) / (high - low) * ANALYTICS_BIN_COUNT)
+    bins = np.clip(bins, 0, ANALYTICS_BIN_COUNT - 1).astype(int)
+    return np.bincount(bins, minlength=ANALYTICS_BIN_COUNT)
+
+def update_analytics(conn, removed_rows, added_rows):
+    """
+    Applies a change to the students table to the analytics aggregates: rows in removed_rows are subtracted and
+    rows in added_rows are added. Must run in the same transaction as the change itself.
+    """
+    # Pass/Fail counts
+    outcome_delta = {}
+    for sign, rows in ((-1, removed_rows), (1, added_rows)):
+        outcomes = _numeric_values(rows, TARGET)
+        for outcome, count in zip(*np.unique(outcomes[~np.isnan(outcomes)].astype(int), return_counts=True)):
+            outcome_delta[int(outcome)] = outcome_delta.get(int(outcome), 0) + sign * int(count)
+    conn.executemany('''
+        INSERT INTO analytics_outcomes (outcome, students) VALUES (?, ?)
+        ON CONFLICT(outcome) DO UPDATE SET students = students + excluded.students
+    ''', [(outcome, delta) for outcome, delta in outcome_delta.items() if delta])
+
+    for col in ANALYTICS_RANGES:
+        removed = _numeric_values(removed_rows, col)
+        added = _numeric_values(added_rows, col)
+        removed = removed[~np.isnan(removed)]
+        added = added[~np.isnan(added)]
+
+        # Fixed-bin histogram
+        hist_delta = _histogram_counts(added, col) - _histogram_counts(removed, col)
+        conn.executemany('''
+            INSERT INTO analytics_histograms (column_name, bin, students) VALUES (?, ?, ?)
+            ON CONFLICT(column_name, bin) DO UPDATE SET students = students + excluded.students
+        ''', [(col, int(b), int(delta)) for b, delta in enumerate(hist_delta) if delta])
+
+        # Summary stats: count, sum and sum of squares can be updated exactly; min/max only grow
+        previous = conn.execute("SELECT min_value, max_value FROM analytics_stats WHERE column_name=?", (col,)).fetchone()
+        conn.execute('''
+            INSERT INTO analytics_stats (column_name, n, total, total_sq, min_value, max_value) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(column_name) DO UPDATE SET
+                n = n + excluded.n,
+                total = total + excluded.total,
+                total_sq = total_sq + excluded.total_sq,
+                min_value = COALESCE(MIN(min_value, excluded.min_value), excluded.min_value, min_value),
+                max_value = COALESCE(MAX(max_value, excluded.max_value), excluded.max_value, max_value)
+        ''', (col, len(added) - len(removed), float(added.sum() - removed.sum()),
+              float((added ** 2).sum() - (removed ** 2).sum()),
+              float(added.min()) if len(added) else None, float(added.max()) if len(added) else None))
+
+        # If a removed value was the current extreme, the true min/max may have shrunk; recompute it from the table
+        if previous is not None and len(removed) and (
+                (previous[0] is not None and removed.min() <= previous[0]) or
+                (previous[1] is not None and removed.max() >= previous[1])):
+            conn.execute(f"UPDATE analytics_stats SET min_value = (SELECT MIN({col}) FROM students), "
+                         f"max_value = (SELECT MAX({col}) FROM students) WHERE column_name=?", (col,))
+
+def rebuild_analytics(conn):
+    """Recomputes all analytics aggregates from scratch by streaming the students table in chunks."""
+    conn.execute("DELETE FROM analytics_outcomes")
+    conn.execute("DELETE FROM analytics_histograms")
+    conn.execute("DELETE FROM analytics_stats")
+    columns = _analytics_source_columns()
+    empty = pd.DataFrame(columns=columns)
+    for chunk in pd.read_sql_query(f"SELECT {', '.join(columns)} FROM students", conn, chunksize=CSV_CHUNK_SIZE):
+        update_analytics(conn, empty, chunk)
+
+@timed
+def get_outcome_counts():
+    """Returns the precomputed number of students per outcome as {outcome: count}."""
+    with db_connection() as conn:
+        rows = conn.execute("SELECT outcome, students FROM analytics_outcomes WHERE students > 0").fetchall()
+    return dict(rows)
+
+@timed
+def get_histogram(col):
+    """Returns (bin_edges, counts) of the precomputed fixed-bin histogram for col."""
+    low, high = ANALYTICS_RANGES[col]
+    counts = np.zeros(ANALYTICS_BIN_COUNT, dtype=int)
+    with db_connection() as conn:
+        for b, students in conn.execute("SELECT bin, students FROM analytics_histograms WHERE column_name=?", (col,)):
+            counts[b] = students
+    return np.linspace(low, high, ANALYTICS_BIN_COUNT + 1), counts
+
+@timed
+def get_summary_stats():
+    """Returns count, mean, standard deviation, min and max per analytics column from the precomputed stats."""
+    with db_connection() as conn:
+        stats = pd.read_sql_query("SELECT * FROM analytics_stats", conn, index_col='column_name')
+    n = stats['n'].where(stats['n'] > 0)
+    mean = stats['total'] / n
+    variance = (stats['total_sq'] / n - mean ** 2).clip(lower=0) # Population variance; clip rounding noise below zero
+    return pd.DataFrame({
+        'count': stats['n'],
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'min': stats['min_value'],
+        'max': stats['max_value'],
+    }).reindex(list(ANALYTICS_RANGES))
 
+# --- Password Hashing Functions ---
 def get_password_hash(password):
     """Hashes a password."""
     return pwd_context.hash(password)
@@ -109,58 +907,259 @@ def get_password_hash(password):
 FEATURES = ['attendance', 'mid_term_marks', 'previous_gpa'] # CRITICAL FIX: Removed 'final_term_marks' to prevent data leakage.
 TARGET = 'outcome' # Target variable for prediction (Pass/Fail)
 
-def train_model(df):
+# --- Model Registry ---
+def _registry_path(*parts):
+    return os.path.join(MODEL_REGISTRY_DIR, *parts)
+
+def stage_model_version(model, metadata):
     """
-    Trains a Logistic Regression model for student performance prediction.
-    It expects 'outcome' (1 for Pass, 0 for Fail) to be present in the DataFrame.
+    Writes a linear model to a temporary directory inside the registry: parameters.npy holds [intercept, coef...]
+    as a plain float64 array and metadata.json the feature list, classes, hyperparameters and training details.
+    Returns the staging directory, which commit_model_version publishes.
     """
-    # Ensure all feature columns are numeric, coercing errors to NaN
-    for col in FEATURES:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+    if not isinstance(model, LogisticRegression):
+        raise TypeError(f"The model registry stores LogisticRegression models only, got {type(model).__name__}.")
+    os.makedirs(_registry_path('versions'), exist_ok=True)
+    staging_dir = _registry_path('versions', f".staging-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(staging_dir)
+
+    parameters = np.hstack([np.asarray(model.intercept_, dtype=np.float64).reshape(1, 1),
+                            np.asarray(model.coef_, dtype=np.float64).reshape(1, -1)])
+    np.save(os.path.join(staging_dir, 'parameters.npy'), parameters)
+    metadata = dict(metadata, model_type=type(model).__name__, features=FEATURES,
+                    classes=np.asarray(model.classes_).tolist(), params=model.get_params(), created_at=time.time())
+    with open(os.path.join(staging_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return staging_dir
+
+def commit_model_version(staging_dir):
+    """Publishes a staged model as the next version and makes it current. Returns the new version name."""
+    while True:
+        # Next after the highest published number, re-read on every attempt; versions removed by hand leave gaps
+        numbers = [int(name[1:]) for name in list_model_version_names() if name[1:].isdigit()]
+        version = f"v{max(numbers, default=0) + 1:06d}"
+        try:
+            os.rename(staging_dir, _registry_path('versions', version)) # Atomic; fails if another process took the name
+            break
+        except OSError:
+            if not os.path.exists(_registry_path('versions', version)):
+                raise
+    set_current_model_version(version)
+    return version
+
+def discard_staged_model(staging_dir):
+    """Deletes a staged model that will not be published."""
+    for name in os.listdir(staging_dir):
+        os.remove(os.path.join(staging_dir, name))
+    os.rmdir(staging_dir)
+
+def _process_alive(pid):
+    """Returns True if a process with this pid exists on this machine."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # Exists, but belongs to another user
+    return True
+
+def discard_orphaned_staged_models():
+    """Deletes staging directories left behind by processes that died before publishing or discarding them."""
+    if not os.path.isdir(_registry_path('versions')):
+        return
+    for name in os.listdir(_registry_path('versions')):
+        if not name.startswith('.staging-'):
+            continue
+        pid = name.split('-')[1]
+        if pid.isdigit() and not _process_alive(int(pid)):
+            discard_staged_model(_registry_path('versions', name))
+
+def save_model(model, metadata=None):
+    """Publishes model as a new registry version and hands it to the shared cache. Returns the version name."""
+    version = commit_model_version(stage_model_version(model, metadata or {}))
+    get_model_cache().store(version, model)
+    return version
+
+def list_model_version_names():
+    """Returns the published version names, oldest first."""
+    if not os.path.isdir(_registry_path('versions')):
+        return []
+    return sorted(name for name in os.listdir(_registry_path('versions')) if name.startswith('v'))
+
+def list_model_versions():
+    """Returns the metadata of every published version, newest first."""
+    rows = []
+    for version in reversed(list_model_version_names()):
+        with open(_registry_path('versions', version, 'metadata.json')) as f:
+            metadata = json.load(f)
+        rows.append({'version': version, 'created_at': pd.to_datetime(metadata['created_at'], unit='s'),
+                     'training_rows': metadata.get('training_rows'), 'accuracy': metadata.get('accuracy'),
+                     'mode': metadata.get('mode'), 'job_id': metadata.get('job_id')})
+    return pd.DataFrame(rows).astype({'training_rows': 'Int64', 'job_id': 'Int64'}) if rows else pd.DataFrame(rows)
+
+def set_current_model_version(version):
+    """Points CURRENT at version (used for publishing and instant rollback). The pointer file is replaced atomically."""
+    if version not in list_model_version_names():
+        raise ValueError(f"Unknown model version: {version}")
+    temp_path = _registry_path(f"CURRENT.{os.getpid()}.tmp")
+    with open(temp_path, 'w') as f:
+        f.write(version)
+    os.replace(temp_path, _registry_path('CURRENT'))
+
+def get_current_model_version():
+    """
+    Returns the current model version name, or a 'legacy-...' key for a pickle at MODEL_PATH when the registry
+    is empty, or None if there is no model at all.
+    """
+    try:
+        with open(_registry_path('CURRENT')) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    try:
+        stat = os.stat(MODEL_PATH)
+    except FileNotFoundError:
+        return None
+    return f"legacy-{stat.st_mtime_ns}-{stat.st_size}"
+
+def get_model_metadata(version):
+    """Returns the metadata.json contents of a registry version."""
+    with open(_registry_path('versions', version, 'metadata.json')) as f:
+        return json.load(f)
+
+def load_model_version(version):
+    """
+    Rebuilds a LogisticRegression from a registry version's parameter array (memory-mapped, no pickle involved).
+    Legacy versions are loaded from the MODEL_PATH pickle.
+    """
+    if version.startswith('legacy-'):
+        return joblib.load(MODEL_PATH)
+
+    metadata = get_model_metadata(version)
+    if metadata['features'] != FEATURES:
+        raise ValueError(f"Model {version} was trained on features {metadata['features']}, but the app uses {FEATURES}.")
+    parameters = np.load(_registry_path('versions', version, 'parameters.npy'), mmap_mode='r', allow_pickle=False)
+
+    model = LogisticRegression(**metadata['params'])
+    model.classes_ = np.array(metadata['classes'])
+    model.intercept_ = parameters[:, 0]
+    model.coef_ = parameters[:, 1:]
+    model.n_features_in_ = len(FEATURES)
+    model.feature_names_in_ = np.array(FEATURES, dtype=object)
+    return model
+
+class ModelCache:
+    """Keeps the current model in memory for all sessions and reloads it only when the registry's current version changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._version = None
+        self._scorer = None
+        self.loads = 0 # Number of times a model was actually loaded
+
+    def get(self):
+        """
+        Returns (model, version) for the current model, loading it only if the current version changed since the
+        last call. Both come from one locked read, so the version always names the returned model.
+        """
+        version = get_current_model_version()
+        with self._lock:
+            if version is None:
+                self._model, self._version = None, None
+            elif version != self._version:
+                self._model = load_model_version(version)
+                self._version = version
+                self.loads += 1
+            return self._model, self._version
+
+    def store(self, version, model):
+        """Records a model that was just published as version, so it is served without being read back."""
+        with self._lock:
+            self._model = model
+            self._version = version
+
+    def scorer(self, model):
+        """Returns a LinearScorer for model, reusing the one built for the cached model while it stays current."""
+        with self._lock:
+            if model is not self._model:
+                return LinearScorer(model)
+            if self._scorer is None or self._scorer.model is not model:
+                self._scorer = LinearScorer(model)
+            return self._scorer
+
+    def version(self):
+        """Returns the version of the cached model, or None if no model is loaded."""
+        with self._lock:
+            return self._version
+
+@st.cache_resource
+def get_model_cache():
+    """Returns the process-wide model cache, shared by all sessions and reruns."""
+    return ModelCache()
+
+@timed
+def load_model_and_version():
+    """
+    Loads the current model from the registry, reusing the in-memory copy while the current version is unchanged.
+    Returns (model, version), or (None, None) if there is no model.
+    """
+    try:
+        return get_model_cache().get()
+    except Exception as e:
+        st.error(f"Error loading model: {e}")
+        return None, None
 
-    # Drop rows where any of the features or the target are missing
-    df.dropna(subset=FEATURES + [TARGET], inplace=True)
+def load_model():
+    """Loads the current model; see load_model_and_version."""
+    return load_model_and_version()[0]
 
-    if df.empty:
-        st.error("Not enough data to train the model after cleaning. Please upload more data with complete records.")
-        return None, None, None, None
+def rollback_model(version):
+    """
+    Makes an earlier registry version current again. Incremental training restarts from the data that version
+    was trained on, so changes made after it are not lost from the next update.
+    """
+    set_current_model_version(version)
+    trained_through = get_model_metadata(version).get('trained_through')
+    with db_transaction() as conn:
+        conn.execute("UPDATE app_meta SET value=? WHERE key='trained_through'", (trained_through,))
 
-    X = df[FEATURES]
-    y = df[TARGET]
+class LinearScorer:
+    """
+    Scores a fitted binary LogisticRegression with plain NumPy: P(pass) = sigmoid(X . coef + intercept).
+    This is the same arithmetic sklearn performs in predict/predict_proba, without its input validation and
+    DataFrame overhead, so for the same input array the outputs are identical.
+    """
 
-    # Check if there are at least two unique classes in the target variable
-    if len(np.unique(y)) < 2:
-        st.warning("Only one class present in the target variable (all Pass or all Fail). Cannot train a classification model.")
-        return None, None, None, None
+    def __init__(self, model):
+        self.model = model
+        self.classes = np.asarray(model.classes_)
+        self.coef_t = np.asarray(model.coef_).T
+        self.intercept = np.asarray(model.intercept_)
 
-    # Split data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    @staticmethod
+    def supports(model):
+        """True if model can be scored by LinearScorer."""
+        return isinstance(model, LogisticRegression) and len(model.classes_) == 2
 
-    # Initialize and train the Logistic Regression model
-    model = LogisticRegression(max_iter=1000, random_state=42)
-    model.fit(X_train, y_train)
+    def decision_function(self, X):
+        return (X @ self.coef_t + self.intercept).ravel()
 
-    # Evaluate the model
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    conf_matrix = confusion_matrix(y_test, y_pred)
-    class_report = classification_report(y_test, y_pred)
+    def predict_proba(self, X):
+        """Returns the probability of the second class ('Pass') for each row of X."""
+        return expit(self.decision_function(X))
 
-    # Save the trained model to a file
-    joblib.dump(model, MODEL_PATH)
-    return model, accuracy, conf_matrix, class_report
+    def predict(self, X):
+        """Returns the predicted class for each row of X (second class when the decision value is positive)."""
+        return self.classes[(self.decision_function(X) > 0).astype(int)]
 
-def load_model():
-    """Loads a pre-trained model from the specified path."""
-    if os.path.exists(MODEL_PATH):
-        try:
-            model = joblib.load(MODEL_PATH)
-            return model
-        except Exception as e:
-            st.error(f"Error loading model: {e}")
-            return None
-    return None
+def get_scorer(model):
+    """Returns the NumPy scorer for model (built once per cached model version), or None if model is not supported."""
+    if not LinearScorer.supports(model):
+        return None
+    return get_model_cache().scorer(model)
 
+@timed
 def predict_performance(model, data):
     """
     Predicts student performance (Pass/Fail) and probability using the trained model.
@@ -169,12 +1168,29 @@ def predict_performance(model, data):
     if model is None:
         return None, None
 
-    # Convert input data to a DataFrame, ensuring correct feature order and type
-    input_df = pd.DataFrame([data])
     for col in FEATURES:
-        if col not in input_df.columns:
+        if col not in data:
             st.error(f"Missing feature: {col} in input data for prediction.")
             return None, None
+
+    scorer = get_scorer(model)
+    if scorer is None:
+        return _predict_performance_sklearn(model, data)
+
+    # Fast path: one 1 x n_features array and a dot product instead of a DataFrame and two sklearn calls
+    X = np.array([[pd.to_numeric(data[col], errors='coerce') for col in FEATURES]], dtype=float)
+    if np.isnan(X).any():
+        return None, None
+    z = scorer.decision_function(X)
+    prediction = scorer.classes[int(z[0] > 0)]
+    probability = expit(z)[0]
+    return prediction, probability
+
+def _predict_performance_sklearn(model, data):
+    """predict_performance through the generic sklearn API; used for models LinearScorer does not support."""
+    # Convert input data to a DataFrame, ensuring correct feature order and type
+    input_df = pd.DataFrame([data])
+    for col in FEATURES:
         input_df[col] = pd.to_numeric(input_df[col], errors='coerce')
 
     # Predict the class (0 or 1)
@@ -192,40 +1208,576 @@ def get_risk_category(probability):
     else:
         return "High Risk"
 
+def get_risk_categories(probabilities):
+    """Vectorized get_risk_category for an array of pass probabilities."""
+    probabilities = np.asarray(probabilities, dtype=float)
+    return np.select([probabilities >= 0.8, probabilities >= 0.5], ["Low Risk", "Medium Risk"], default="High Risk")
+
+def complete_feature_rows(df):
+    """
+    Coerces FEATURES to numbers in place and returns (rows with every feature present, reindexed from 0; number of
+    rows skipped because a feature is missing or not numeric).
+    """
+    for col in FEATURES:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    complete = df[FEATURES].notna().all(axis=1)
+    return df.loc[complete].reset_index(drop=True), int((~complete).sum())
+
+def score_features(model, features):
+    """
+    Scores each row of a DataFrame of complete FEATURES with the same decision rule as predict_performance, using
+    the NumPy scorer when possible. Returns (predictions, pass probabilities, risk categories) as arrays.
+    """
+    if features.empty:
+        return np.asarray(model.classes_)[:0], np.empty(0), get_risk_categories(np.empty(0))
+    scorer = get_scorer(model)
+    if scorer is not None:
+        # Threshold the decision value rather than the probability: expit rounds tiny decision values to exactly 0.5
+        decision = scorer.decision_function(features[FEATURES].to_numpy(dtype=float))
+        predictions = scorer.classes[(decision > 0).astype(int)]
+        probabilities = expit(decision)
+    else:
+        predictions = model.predict(features[FEATURES])
+        probabilities = model.predict_proba(features[FEATURES])[:, 1]
+    return predictions, probabilities, get_risk_categories(probabilities)
+
+@timed
+def score_all_students(model, model_version):
+    """
+    Predicts outcome, pass probability and risk category for every student with complete features in one
+    vectorized score_features call, and stores the results in the predictions table under model_version, which
+    must be the registry version of model.
+    """
+    start = time.perf_counter()
+    with db_connection() as conn:
+        df = pd.read_sql_query(f"SELECT student_id, {', '.join(FEATURES)} FROM students", conn)
+    scored, skipped = complete_feature_rows(df)
+    predictions, probabilities, risk_categories = score_features(model, scored)
+
+    scored_at = time.time()
+    rows = zip(scored['student_id'].tolist(), [model_version] * len(scored), predictions.tolist(),
+               probabilities.tolist(), risk_categories.tolist(), [scored_at] * len(scored))
+    with db_transaction() as conn:
+        conn.execute("DELETE FROM predictions WHERE model_version=?", (model_version,))
+        conn.executemany("INSERT INTO predictions (student_id, model_version, prediction, probability, risk_category, scored_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    return {
+        'model_version': model_version,
+        'students_scored': len(scored),
+        'students_skipped': skipped,
+        'seconds': time.perf_counter() - start,
+    }
+
+@timed
+def get_risk_summary(model_version):
+    """Returns the number of students per risk category scored by the given model version."""
+    with db_connection() as conn:
+        return pd.read_sql_query("SELECT risk_category, COUNT(*) AS students FROM predictions WHERE model_version=? "
+                                 "GROUP BY risk_category ORDER BY risk_category", conn, params=(model_version,))
+
+def _estimate_filter_matches(filters, model_version):
+    """
+    Estimates from the analytics aggregates how many students each active browser filter matches, without
+    scanning the students table. Returns (total students, {filter: estimated matches}). Range estimates count
+    every histogram bin the range overlaps, so they err on the high side.
+    """
+    total = sum(get_outcome_counts().values())
+    matches = {}
+    for col in BROWSER_RANGE_FILTERS:
+        if filters.get(col) is not None:
+            low, high = filters[col]
+            edges, counts = get_histogram(col)
+            overlaps = (edges[1:] >= low) & (edges[:-1] <= high)
+            matches[col] = int(counts[overlaps].sum())
+    if filters.get('outcome') is not None:
+        matches['outcome'] = get_outcome_counts().get(filters['outcome'], 0)
+    if filters.get('risk_category') is not None:
+        with db_connection() as conn:
+            matches['risk_category'] = conn.execute("SELECT COUNT(*) FROM predictions WHERE model_version=? AND risk_category=?",
+                                                    (model_version, filters['risk_category'])).fetchone()[0]
+    return total, matches
+
+def _use_filter_indexes(total, matches, page_size):
+    """
+    Chooses between the two ways SQLite can answer a browser page. Via a filter index it reads and sorts every
+    student matching the most selective filter; walking student_id order it reads about page_size / (share of
+    students matching all filters) rows before the LIMIT is reached. Returns True if the index is cheaper.
+    """
+    if not matches or not total:
+        return False
+    matching_share = np.prod([count / total for count in matches.values()])
+    walk_cost = min(total, page_size / matching_share) if matching_share else total
+    return min(matches.values()) < walk_cost
+
+@timed
+def get_students_page(filters, model_version=None, after_id=None, page_size=STUDENT_PAGE_SIZE):
+    """
+    Returns one page of students ordered by student_id, starting after after_id, and the student_id to continue
+    from (None on the last page). Filtering and paging run in SQL with keyset pagination. filters may hold
+    (low, high) ranges for BROWSER_RANGE_FILTERS, 'outcome' (0 or 1) and 'risk_category'; risk categories come
+    from the predictions stored for model_version by batch scoring.
+    """
+    total, matches = _estimate_filter_matches(filters, model_version)
+    # A unary + stops SQLite from using a column's index. Without it SQLite always prefers a filter index, which
+    # for a broad filter means sorting most of the table on every page instead of stopping after page_size rows.
+    use_indexes = _use_filter_indexes(total, matches, page_size)
+    index_hint = '' if use_indexes else '+'
+    # A risk filter makes the join an inner join, which SQLite may reorder to start from predictions; CROSS JOIN
+    # is SQLite's way to keep students as the outer loop so the walk in student_id order is preserved
+    join = 'CROSS JOIN' if not use_indexes and filters.get('risk_category') is not None else 'LEFT JOIN'
+
+    conditions, params = [], []
+    if after_id is not None:
+        conditions.append("s.student_id > ?")
+        params.append(after_id)
+    for col in BROWSER_RANGE_FILTERS:
+        if filters.get(col) is not None:
+            conditions.append(f"{index_hint}s.{col} BETWEEN ? AND ?")
+            params.extend(filters[col])
+    if filters.get('outcome') is not None:
+        conditions.append(f"{index_hint}s.outcome = ?")
+        params.append(filters['outcome'])
+    if filters.get('risk_category') is not None:
+        conditions.append(f"{index_hint}p.risk_category = ?")
+        params.append(filters['risk_category'])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Fetch one extra row to learn whether there is a next page without counting the matches
+    sql = f"""
+        SELECT s.student_id, s.name, s.attendance, s.mid_term_marks, s.final_term_marks, s.previous_gpa, s.outcome,
+               p.probability, p.risk_category
+        FROM students s
+        {join} predictions p ON p.student_id = s.student_id AND p.model_version = ?
+        {where}
+        ORDER BY s.student_id
+        LIMIT ?
+    """
+    with db_connection() as conn:
+        page = pd.read_sql_query(sql, conn, params=[model_version] + params + [page_size + 1])
+    if len(page) > page_size:
+        page = page.iloc[:page_size]
+        return page, page['student_id'].iloc[-1]
+    return page, None
+
+# (risk category, condition, recommendation); a condition (column, threshold) applies when the value is below threshold
+RECOMMENDATION_RULES = [
+    ("High Risk", None, "Immediate intervention is recommended."),
+    ("High Risk", ('attendance', 70), "Focus on improving attendance to ensure better learning opportunities."),
+    ("High Risk", ('mid_term_marks', 50), "Intensify preparation for final exams; consider tutoring or study groups."),
+    ("High Risk", ('previous_gpa', 2.5), "Strengthen foundational concepts from previous academic terms."),
+    ("Medium Risk", None, "Monitor student progress closely and offer support as needed."),
+    ("Medium Risk", ('attendance', 80), "Encourage consistent attendance to keep up with coursework."),
+    ("Medium Risk", ('mid_term_marks', 65), "Dedicate more time to understanding challenging topics before final exams."),
+    ("Low Risk", None, "Student is performing well. Encourage continued excellence."),
+    ("Low Risk", None, "Suggest participation in advanced topics or extracurricular activities to further enrich their learning."),
+]
+
 def get_recommendations(student_data, risk_category):
     """Generates actionable recommendations based on student data and risk level."""
-    recommendations = []
-    # Make sure relevant keys exist in student_data dictionary
-    attendance = student_data.get('attendance', 0)
-    mid_term_marks = student_data.get('mid_term_marks', 0)
-    previous_gpa = student_data.get('previous_gpa', 0)
-
-    if risk_category == "High Risk":
-        recommendations.append("Immediate intervention is recommended.")
-        if attendance < 70:
-            recommendations.append("Focus on improving attendance to ensure better learning opportunities.")
-        if mid_term_marks < 50:
-            recommendations.append("Intensify preparation for final exams; consider tutoring or study groups.")
-        if previous_gpa < 2.5:
-            recommendations.append("Strengthen foundational concepts from previous academic terms.")
-    elif risk_category == "Medium Risk":
-        recommendations.append("Monitor student progress closely and offer support as needed.")
-        if attendance < 80:
-            recommendations.append("Encourage consistent attendance to keep up with coursework.")
-        if mid_term_marks < 65:
-            recommendations.append("Dedicate more time to understanding challenging topics before final exams.")
-    else: # Low Risk
-        recommendations.append("Student is performing well. Encourage continued excellence.")
-        recommendations.append("Suggest participation in advanced topics or extracurricular activities to further enrich their learning.")
-
-    return recommendations
+    if risk_category not in ("High Risk", "Medium Risk"):
+        risk_category = "Low Risk"
+    # Missing keys count as 0, so their conditions apply; a None (NULL) value never meets a condition, like NaN
+    return [text for category, condition, text in RECOMMENDATION_RULES
+            if category == risk_category and (condition is None or _below(student_data.get(condition[0], 0), condition[1]))]
+
+def _below(value, threshold):
+    """value < threshold, treating None as unknown (False)."""
+    return value is not None and value < threshold
+
+def get_recommendations_batch(df, risk_categories):
+    """
+    Vectorized get_recommendations for every row of df (which must hold the rule columns) with its risk category.
+    Returns each row's recommendations joined into one string.
+    """
+    risk_categories = np.asarray(risk_categories)
+    risk_categories = np.where(np.isin(risk_categories, ["High Risk", "Medium Risk"]), risk_categories, "Low Risk")
+    recommendations = np.full(len(df), "", dtype=object)
+    for category, condition, text in RECOMMENDATION_RULES:
+        applies = risk_categories == category
+        if condition is not None:
+            applies &= df[condition[0]].to_numpy(dtype=float) < condition[1]
+        recommendations = np.where(applies, recommendations + " " + text, recommendations)
+    return pd.Series(recommendations, dtype=object).str.lstrip().to_numpy()
+
+# --- Bulk Export ---
+def sweep_exports(max_age=EXPORT_MAX_AGE):
+    """Deletes export files older than max_age seconds, e.g. those of sessions that never downloaded them."""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError: # Removed by another session's sweep
+            pass
+
+def export_formats():
+    """File formats the predictions export can produce in this installation."""
+    return ['CSV', 'Parquet'] if pq is not None else ['CSV']
+
+@timed
+def export_predictions(model, path, file_format='CSV', chunk_size=EXPORT_CHUNK_SIZE, progress_callback=None):
+    """
+    Writes predicted outcome, pass probability, risk category and recommendations for every student with complete
+    features to path as CSV or Parquet. Students are read, scored and written chunk_size at a time, so memory use
+    depends on chunk_size rather than the number of students. progress_callback, if given, is called with the
+    number of students exported so far after every chunk. Returns export statistics.
+    """
+    start = time.perf_counter()
+    stats = {'students_exported': 0, 'students_skipped': 0}
+    columns = ['student_id', 'name'] + FEATURES + ['predicted_outcome', 'pass_probability', 'risk_category', 'recommendations']
+    # Fixed Parquet schema, so a chunk whose names are all missing, or an export with no rows, still has these types
+    if file_format == 'Parquet':
+        schema = pa.schema([(col, pa.float64() if col in FEATURES or col == 'pass_probability' else pa.string()) for col in columns])
+    writer = None
+    with db_connection() as conn:
+        chunks = pd.read_sql_query(f"SELECT student_id, name, {', '.join(FEATURES)} FROM students ORDER BY student_id",
+                                   conn, chunksize=chunk_size)
+        try:
+            for chunk in chunks:
+                chunk, skipped = complete_feature_rows(chunk)
+                stats['students_skipped'] += skipped
+
+                predictions, probabilities, risk_categories = score_features(model, chunk)
+                report = chunk.assign(
+                    predicted_outcome=np.where(predictions == 1, "Pass", "Fail"),
+                    pass_probability=probabilities,
+                    risk_category=risk_categories,
+                    recommendations=get_recommendations_batch(chunk, risk_categories),
+                )[columns]
+
+                if file_format == 'Parquet':
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, schema)
+                    writer.write_table(pa.Table.from_pandas(report, schema=writer.schema, preserve_index=False))
+                else:
+                    report.to_csv(path, mode='w' if stats['students_exported'] == 0 else 'a',
+                                  header=stats['students_exported'] == 0, index=False)
+                stats['students_exported'] += len(report)
+                if progress_callback is not None:
+                    progress_callback(stats['students_exported'])
+        finally:
+            if writer is not None:
+                writer.close()
+
+    if stats['students_exported'] == 0: # Still produce a file, with the columns but no rows
+        if file_format == 'Parquet':
+            pq.write_table(schema.empty_table(), path)
+        else:
+            pd.DataFrame(columns=columns).to_csv(path, index=False)
+    stats['seconds'] = time.perf_counter() - start
+    stats['bytes'] = os.path.getsize(path)
+    return stats
+
+def _read_training_arrays():
+    """
+    Streams FEATURES, TARGET and the hashed train/test assignment from SQLite into preallocated compact arrays
+    (float32 features, int8 target), one chunk at a time. Returns (X, y, is_test, trained_through).
+    """
+    not_null = ' AND '.join(f"{col} IS NOT NULL" for col in FEATURES + [TARGET])
+    with db_connection() as conn:
+        conn.execute("BEGIN") # One read snapshot, so the row count matches the rows streamed afterwards
+        try:
+            n = conn.execute(f"SELECT COUNT(*) FROM students WHERE {not_null}").fetchone()[0]
+            X = np.empty((n, len(FEATURES)), dtype=np.float32)
+            y = np.empty(n, dtype=np.int8)
+            is_test = np.empty(n, dtype=bool)
+            trained_through = 0
+            filled = 0
+            query = f"SELECT student_id, {', '.join(FEATURES)}, {TARGET}, row_version FROM students WHERE {not_null}"
+            for chunk in pd.read_sql_query(query, conn, chunksize=TRAINING_CHUNK_SIZE):
+                values = chunk[FEATURES + [TARGET]].apply(pd.to_numeric, errors='coerce')
+                valid = values.notna().all(axis=1).to_numpy()
+                count = int(valid.sum())
+                X[filled:filled + count] = values[FEATURES].to_numpy(dtype=np.float32)[valid]
+                y[filled:filled + count] = values[TARGET].to_numpy()[valid].astype(np.int8)
+                # A stable hash of the ID keeps each student in the same split across runs without shuffling the table
+                hashes = pd.util.hash_pandas_object(chunk['student_id'], index=False).to_numpy()
+                is_test[filled:filled + count] = (hashes % 100 < TEST_SPLIT_PERCENT)[valid]
+                trained_through = max(trained_through, int(chunk['row_version'].max()))
+                filled += count
+        finally:
+            conn.rollback()
+    return X[:filled], y[:filled], is_test[:filled], trained_through
+
+def load_training_arrays():
+    """
+    Returns (X, y, is_test, trained_through) for training. When TRAINING_CACHE_DIR is set the arrays are saved
+    as .npy files per data version and reopened memory-mapped, so repeated jobs on unchanged data skip SQLite.
+    """
+    if TRAINING_CACHE_DIR is None:
+        return _read_training_arrays()
+
+    data_version = get_data_version()
+    prefix = os.path.join(TRAINING_CACHE_DIR, f"training_v{data_version}")
+    names = ['X', 'y', 'is_test']
+    if not all(os.path.exists(f"{prefix}_{name}.npy") for name in names):
+        os.makedirs(TRAINING_CACHE_DIR, exist_ok=True)
+        for old_file in os.listdir(TRAINING_CACHE_DIR): # Arrays of older data versions are never read again
+            if old_file.startswith("training_v"):
+                os.remove(os.path.join(TRAINING_CACHE_DIR, old_file))
+        arrays = _read_training_arrays()
+        for name, array in zip(names, arrays):
+            np.save(f"{prefix}_{name}.npy", array)
+    X, y, is_test = (np.load(f"{prefix}_{name}.npy", mmap_mode='r') for name in names)
+    return X, y, is_test, data_version
+
+@timed
+def train_model_streaming():
+    """
+    Trains a Logistic Regression model for student performance prediction on compact NumPy arrays streamed from
+    SQLite instead of a full DataFrame, with the train/test split done by hashed student_id. Raises ValueError if
+    there is not enough data. Returns (model, accuracy, conf_matrix, class_report, training_rows, trained_through).
+    """
+    X, y, is_test, trained_through = load_training_arrays()
+    if len(y) == 0:
+        raise ValueError("Not enough data to train the model. Please upload more data with complete records.")
+
+    is_train, note = ~is_test, ""
+    if not is_test.any() or is_test.all():
+        # With only a few students the hashed split can put all of them on one side; use all for both then
+        is_train = is_test = np.ones(len(y), dtype=bool)
+        note = "Too few students for a held-out test set; evaluated on the training data.\n\n"
+    if len(np.unique(y[is_train])) < 2:
+        raise ValueError("Only one class present in the training data (all Pass or all Fail). Cannot train a classification model.")
+
+    model = LogisticRegression(max_iter=1000, random_state=42)
+    model.fit(X[is_train], y[is_train])
+
+    y_pred = model.predict(X[is_test])
+    accuracy = accuracy_score(y[is_test], y_pred)
+    conf_matrix = confusion_matrix(y[is_test], y_pred, labels=[0, 1])
+    class_report = note + classification_report(y[is_test], y_pred, labels=[0, 1], zero_division=0)
+
+    # Record the feature names so predictions made from DataFrames are checked against them as usual
+    model.feature_names_in_ = np.array(FEATURES, dtype=object)
+    return model, accuracy, conf_matrix, class_report, len(y), trained_through
+
+def get_training_state(conn):
+    """Reads the incremental training bookkeeping from app_meta."""
+    rows = conn.execute("SELECT key, value FROM app_meta WHERE key IN ('trained_through', 'rows_since_full_refit', 'updates_since_full_refit')")
+    return dict(rows.fetchall())
+
+def choose_training_mode(model, state, changed_rows, total_rows):
+    """Decides between an incremental update and a full refit (the periodic fallback) for the next training run."""
+    if model is None or state.get('trained_through') is None:
+        return 'full'
+    if state['updates_since_full_refit'] >= FULL_REFIT_EVERY:
+        return 'full'
+    if state['rows_since_full_refit'] + changed_rows > FULL_REFIT_FRACTION * total_rows:
+        return 'full'
+    return 'incremental'
+
+@timed
+def get_changed_training_rows(since):
+    """Returns the complete training rows (FEATURES, TARGET and row_version) changed after data version since."""
+    with db_connection() as conn:
+        df_changed = pd.read_sql_query(f"SELECT {', '.join(FEATURES)}, {TARGET}, row_version FROM students WHERE row_version > ?",
+                                       conn, params=(since,))
+    return df_changed.dropna(subset=FEATURES + [TARGET])
+
+def update_model_incrementally(model, df_changed):
+    """
+    Returns a copy of a fitted linear model nudged towards df_changed with one pass of SGD on the log loss, so the
+    cost depends on the number of changed rows rather than the table size. Features are standardized with the
+    precomputed column statistics while updating, and the coefficients are mapped back to raw feature units.
+    """
+    stats = get_summary_stats().loc[FEATURES]
+    mean = stats['mean'].to_numpy(dtype=float)
+    std = stats['std'].fillna(1.0).replace(0.0, 1.0).to_numpy(dtype=float)
+
+    X = (df_changed[FEATURES].to_numpy(dtype=float) - mean) / std
+    y = df_changed[TARGET].to_numpy(dtype=int)
+
+    # Same model expressed in standardized units: w_z = w * std and b_z = b + w . mean
+    coef = model.coef_.ravel()
+    sgd = SGDClassifier(loss='log_loss', learning_rate='constant', eta0=INCREMENTAL_LEARNING_RATE,
+                        alpha=1.0 / (model.C * max(int(stats['count'].min()), 1)), random_state=42)
+    sgd.coef_ = (coef * std).reshape(1, -1)
+    sgd.intercept_ = np.array([model.intercept_[0] + coef @ mean])
+    sgd.partial_fit(X, y, classes=model.classes_)
+
+    updated = copy.deepcopy(model)
+    coef_z = sgd.coef_.ravel()
+    updated.coef_ = (coef_z / std).reshape(1, -1)
+    updated.intercept_ = np.array([sgd.intercept_[0] - (coef_z / std) @ mean])
+    return updated
+
+# --- Background Training Jobs ---
+def run_training_job(job_id):
+    """
+    Body of a training worker process (see TrainingJobRunner). Depending on the job's requested mode it refits the
+    model on all data or updates it with only the rows changed since the last trained version, and publishes the
+    model only if the job is still marked running, so a cancelled job never replaces the current model.
+    """
+    try:
+        with db_connection() as conn:
+            requested_mode = conn.execute("SELECT requested_mode FROM training_jobs WHERE job_id=?", (job_id,)).fetchone()[0]
+            state = get_training_state(conn)
+            since = state.get('trained_through') or 0
+            changed_rows = conn.execute("SELECT COUNT(*) FROM students WHERE row_version > ?", (since,)).fetchone()[0]
+        model = load_model()
+        mode = requested_mode
+        if mode == 'auto':
+            mode = choose_training_mode(model, state, changed_rows, sum(get_outcome_counts().values()))
+        elif mode == 'incremental' and (model is None or state.get('trained_through') is None):
+            mode = 'full' # Nothing to update yet
+
+        if mode == 'incremental':
+            df_changed = get_changed_training_rows(since)
+            if df_changed.empty:
+                with db_transaction() as conn:
+                    conn.execute("UPDATE training_jobs SET status='skipped', mode=?, finished_at=?, training_rows=0 WHERE job_id=? AND status='running'",
+                                 (mode, time.time(), job_id))
+                return
+            trained_through = int(df_changed['row_version'].max())
+            # Test-then-train: the current model is evaluated on the new rows before it learns from them
+            y_pred = model.predict(df_changed[FEATURES])
+            y_true = df_changed[TARGET].astype(int)
+            accuracy = accuracy_score(y_true, y_pred)
+            conf_matrix = confusion_matrix(y_true, y_pred, labels=[0, 1])
+            class_report = classification_report(y_true, y_pred, labels=[0, 1], zero_division=0)
+            model = update_model_incrementally(model, df_changed)
+            training_rows = len(df_changed)
+        else:
+            model, accuracy, conf_matrix, class_report, training_rows, trained_through = train_model_streaming()
+        staging_dir = stage_model_version(model, {'training_rows': training_rows, 'accuracy': float(accuracy), 'mode': mode,
+                                                  'job_id': job_id, 'trained_through': trained_through})
+
+        # Checking the status and publishing under the write lock makes publish and cancel mutually exclusive
+        with db_transaction() as conn:
+            status = conn.execute("SELECT status FROM training_jobs WHERE job_id=?", (job_id,)).fetchone()[0]
+            if status != 'running':
+                discard_staged_model(staging_dir)
+                return
+            model_version = commit_model_version(staging_dir)
+            conn.execute('''
+                UPDATE training_jobs SET status='succeeded', mode=?, model_version=?, finished_at=?, training_rows=?, accuracy=?,
+                    confusion_matrix=?, classification_report=?
+                WHERE job_id=?
+            ''', (mode, model_version, time.time(), training_rows, float(accuracy), json.dumps(conf_matrix.tolist()), class_report, job_id))
+
+            if mode == 'full':
+                meta = {'trained_through': trained_through, 'rows_since_full_refit': 0, 'updates_since_full_refit': 0}
+            else:
+                meta = {'trained_through': trained_through,
+                        'rows_since_full_refit': state['rows_since_full_refit'] + training_rows,
+                        'updates_since_full_refit': state['updates_since_full_refit'] + 1}
+            conn.executemany("UPDATE app_meta SET value=? WHERE key=?", [(value, key) for key, value in meta.items()])
+    except Exception as e:
+        with db_transaction() as conn:
+            conn.execute("UPDATE training_jobs SET status='failed', finished_at=?, error=? WHERE job_id=? AND status='running'",
+                         (time.time(), str(e), job_id))
+
+class TrainingJobRunner:
+    """
+    Runs training jobs in separate worker processes (at most max_workers at a time) so model fitting never blocks a
+    Streamlit session. Job state lives in the training_jobs table; each worker is `python app.py --train-job ...`.
+    """
+
+    def __init__(self, max_workers=TRAINING_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._processes = {} # job_id -> subprocess.Popen
+        self._lock = threading.Lock()
+
+    def submit(self, requested_by=None, mode='auto'):
+        """
+        Queues a new training job, starts it if a worker slot is free and returns its job_id.
+        mode is 'full', 'incremental' or 'auto' (incremental unless a periodic full refit is due).
+        """
+        with db_transaction() as conn:
+            job_id = conn.execute("INSERT INTO training_jobs (status, requested_by, requested_mode, created_at) VALUES ('queued', ?, ?, ?)",
+                                  (requested_by, mode, time.time())).lastrowid
+        self.poll()
+        return job_id
+
+    def poll(self):
+        """
+        Reaps finished worker processes and starts queued jobs while worker slots are free. Running jobs this runner
+        did not start (e.g. from before a server restart or a "Clear cache") are checked through their recorded pid.
+        """
+        with self._lock:
+            workers_exited = False
+            for job_id, process in list(self._processes.items()):
+                if process.poll() is None:
+                    continue
+                del self._processes[job_id]
+                workers_exited = True
+                # A worker that exits while its job is still 'running' crashed before it could record a result
+                with db_transaction() as conn:
+                    conn.execute("UPDATE training_jobs SET status='failed', finished_at=?, error=? WHERE job_id=? AND status='running'",
+                                 (time.time(), f"Training worker exited unexpectedly (exit code {process.returncode}).", job_id))
+
+            with db_connection() as conn:
+                running = conn.execute("SELECT job_id, pid FROM training_jobs WHERE status='running' AND pid IS NOT NULL").fetchall()
+            orphaned = [job_id for job_id, pid in running if job_id not in self._processes and not _process_alive(pid)]
+            if orphaned:
+                with db_transaction() as conn:
+                    conn.executemany("UPDATE training_jobs SET status='failed', finished_at=?, error=? WHERE job_id=? AND status='running'",
+                                     [(time.time(), "Training worker is no longer running.", job_id) for job_id in orphaned])
+            if workers_exited or orphaned:
+                discard_orphaned_staged_models() # A worker killed mid-publish leaves its staging directory behind
+
+            while len(self._processes) < self.max_workers:
+                job_id = self._claim_next_job()
+                if job_id is None:
+                    break
+                process = subprocess.Popen([sys.executable, os.path.abspath(__file__), TRAINING_JOB_FLAG, str(job_id), DB_NAME, MODEL_REGISTRY_DIR])
+                self._processes[job_id] = process
+                with db_transaction() as conn:
+                    conn.execute("UPDATE training_jobs SET pid=? WHERE job_id=?", (process.pid, job_id))
+
+    def _claim_next_job(self):
+        """Atomically marks the oldest queued job as running and returns its job_id, or None if the queue is empty."""
+        with db_transaction() as conn:
+            row = conn.execute("SELECT job_id FROM training_jobs WHERE status='queued' ORDER BY job_id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE training_jobs SET status='running', started_at=? WHERE job_id=?", (time.time(), row[0]))
+        return row[0]
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job, terminating its worker if this process started it. Returns True if cancelled."""
+        with db_transaction() as conn:
+            cancelled = conn.execute("UPDATE training_jobs SET status='cancelled', finished_at=? WHERE job_id=? AND status IN ('queued', 'running')",
+                                     (time.time(), job_id)).rowcount
+        if cancelled:
+            with self._lock:
+                process = self._processes.pop(job_id, None)
+            if process is not None:
+                process.terminate()
+                process.wait()
+        return bool(cancelled)
+
+@st.cache_resource
+def get_training_runner():
+    """Returns the process-wide training job runner, shared by all sessions and reruns."""
+    return TrainingJobRunner()
+
+@timed
+def get_training_jobs(limit=10):
+    """Returns the most recent training jobs, newest first."""
+    with db_connection() as conn:
+        jobs = pd.read_sql_query("SELECT * FROM training_jobs ORDER BY job_id DESC LIMIT ?", conn, params=(limit,))
+    jobs['duration_seconds'] = jobs['finished_at'] - jobs['started_at']
+    return jobs
 
 # --- Streamlit UI Functions ---
 st.set_page_config(page_title="Student Academic Performance Predictor", layout="wide", initial_sidebar_state="expanded")
 
 def main():
     """Main function to run the Streamlit application."""
-    init_db() # Initialize the database
+    with span('rerun'):
+        rerun_start = time.perf_counter()
+        run_app()
+        st.session_state.last_rerun_seconds = time.perf_counter() - rerun_start
+
+def run_app():
+    """Runs one rerun of the app: database bootstrap, login state and the dashboard or login page."""
+    bootstrap_db(DB_NAME) # Initialize the database (only does work on the first run in this process)
 
     # Initialize session state variables for login if they don't exist
     if 'logged_in' not in st.session_state:
@@ -239,6 +1791,7 @@ def main():
     else:
         show_dashboard()
 
+@timed
 def show_login_page():
     """Displays the login form for users."""
     st.markdown("<h1 style='text-align: center;'>Login to Student Performance Dashboard</h1>", unsafe_allow_html=True)
@@ -252,7 +1805,7 @@ def show_login_page():
             submitted = st.form_submit_button("Login")
 
             if submitted:
-                user = get_user(username, password)
+                user, error = get_login_service().authenticate(username, password, client_ip=getattr(st.context, 'ip_address', None))
                 if user:
                     st.session_state.logged_in = True
                     st.session_state.username = user['username']
@@ -260,7 +1813,7 @@ def show_login_page():
                     st.success(f"Logged in as {st.session_state.role.capitalize()}")
                     st.rerun() # Rerun to switch to dashboard
                 else:
-                    st.error("Invalid username or password. Please try again.")
+                    st.error(error)
 
     st.markdown("""
         <div style='text-align: center; margin-top: 20px;'>
@@ -279,6 +1832,8 @@ def show_dashboard():
     st.sidebar.title(f"Welcome, {st.session_state.username}!")
     st.sidebar.markdown(f"**Role:** {st.session_state.role.capitalize()}")
     st.sidebar.button("Logout", on_click=logout, help="Click to log out of the application.")
+    if st.session_state.role == 'admin':
+        show_startup_timing()
 
     st.markdown("<h1 style='text-align: center;'>Student Academic Performance Prediction Dashboard</h1>", unsafe_allow_html=True)
 
@@ -290,6 +1845,14 @@ def show_dashboard():
     elif st.session_state.role == 'student':
         student_dashboard()
 
+def show_startup_timing():
+    """Shows one-time database bootstrap cost and the duration of this session's previous rerun in the sidebar."""
+    startup = bootstrap_db(DB_NAME)
+    st.sidebar.caption(f"Schema v{startup['schema_version']} initialized in {startup['init_db_seconds'] * 1000:.0f} ms (once per process)")
+    last_rerun = st.session_state.get('last_rerun_seconds')
+    if last_rerun is not None:
+        st.sidebar.caption(f"Previous rerun: {last_rerun * 1000:.0f} ms")
+
 def logout():
     """Logs out the current user and resets session state."""
     st.session_state.logged_in = False
@@ -297,6 +1860,7 @@ def logout():
     st.session_state.role = None
     st.rerun() # Rerun to go back to the login page
 
+@timed
 def admin_dashboard():
     """Content for the Admin dashboard."""
     st.header("Admin Privileges")
@@ -304,51 +1868,153 @@ def admin_dashboard():
     st.subheader("📊 Upload New Student Data")
     st.write("Upload a CSV file containing student information. Ensure it has columns like `student_id`, `name`, `attendance`, `mid_term_marks`, `final_term_marks`, `previous_gpa`.")
     uploaded_file = st.file_uploader("Choose a CSV file", type=["csv"], help="The CSV should contain student academic records.")
+    # Streamlit reruns this script on every interaction, so remember which upload was already ingested
+    upload_key = None
     if uploaded_file is not None:
-        try:
-            df = pd.read_csv(uploaded_file)
-            required_columns = ['student_id', 'name', 'attendance', 'mid_term_marks', 'final_term_marks', 'previous_gpa']
+        upload_key = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    if uploaded_file is not None and st.session_state.get('ingested_upload') != upload_key:
+        progress_bar = st.progress(0.0, text="Uploading student data...")
 
-            if not all(col in df.columns for col in required_columns):
-                st.error(f"Error: The uploaded CSV must contain all required columns: {', '.join(required_columns)}. Please check your file.")
-            else:
-                # For demo, define 'outcome': 1 if final_term_marks >= 60, else 0
-                df[TARGET] = (df['final_term_marks'] >= 60).astype(int)
-                add_student_data(df)
-                st.success("Data uploaded and saved successfully!")
-                st.dataframe(df.head()) # Display first few rows of the uploaded data
+        def report_progress(stats):
+            progress_bar.progress(stats['fraction_done'],
+                                  text=f"{stats['rows_read']:,} rows processed ({stats['rows_per_second']:,.0f} rows/sec), {stats['rows_rejected']:,} rejected")
+
+        try:
+            stats = ingest_student_csv(uploaded_file, progress_callback=report_progress)
+            st.session_state.ingested_upload = upload_key
+            progress_bar.progress(1.0, text="Upload complete.")
+            st.success(f"Data uploaded and saved successfully! {stats['rows_written']:,} rows processed in {stats['seconds']:.1f}s "
+                       f"({stats['rows_per_second']:,.0f} rows/sec): {stats['rows_inserted']:,} new, "
+                       f"{stats['rows_updated']:,} updated, {stats['rows_unchanged']:,} unchanged.")
+            if stats['rows_rejected']:
+                st.warning(f"{stats['rows_rejected']:,} rows were skipped because of a missing student ID, missing final-term marks or non-numeric values.")
+            if stats['preview'] is not None:
+                st.dataframe(stats['preview']) # Display first few rows of the uploaded data
+        except ValueError as e:
+            progress_bar.empty()
+            st.error(f"Error: {e} Please check your file.")
         except Exception as e:
+            progress_bar.empty()
             st.error(f"An error occurred while processing the CSV file: {e}")
 
     st.subheader("⚙️ Train/Retrain Machine Learning Model")
     st.write("Train or retrain the prediction model using the current student data in the database.")
-    if st.button("Train Model Now", help="This will train a new model and save it. Existing model will be overwritten."):
-        df_students = get_all_student_data()
-        if df_students.empty:
+    runner = get_training_runner()
+    runner.poll()
+    full_refit = st.checkbox("Force full refit", help="By default only students changed since the last training are used, with a periodic full refit.")
+    if st.button("Train Model Now", help="Starts a background training job. The current model is replaced only when the new one finishes."):
+        if not get_outcome_counts():
             st.warning("No student data available in the database to train the model. Please upload data first.")
         else:
-            with st.spinner("Training model... This may take a moment."):
-                model, accuracy, conf_matrix, class_report = train_model(df_students)
-                if model:
-                    st.success("Model trained successfully!")
-                    st.metric(label="Model Accuracy", value=f"{accuracy:.2%}")
-
-                    st.markdown("#### Confusion Matrix")
-                    st.dataframe(pd.DataFrame(conf_matrix, index=['Actual Fail', 'Actual Pass'], columns=['Predicted Fail', 'Predicted Pass']))
-                    st.markdown("#### Classification Report")
-                    st.code(class_report)
-                else:
-                    st.error("Failed to train model. Check logs or previous warnings.")
+            job_id = runner.submit(requested_by=st.session_state.username, mode='full' if full_refit else 'auto')
+            st.info(f"Training job #{job_id} started in the background. You can keep using the dashboard.")
+    display_training_jobs(runner)
+    display_model_versions()
+
+    st.subheader("🎯 Batch Risk Scoring")
+    st.write("Score every student in the database with the current model and store their risk categories.")
+    if st.button("Score All Students", help="Runs the current model over the whole student table in one pass."):
+        model, model_version = load_model_and_version()
+        if model is None:
+            st.warning("The machine learning model has not been trained yet. Please train the model first.")
+        else:
+            with st.spinner("Scoring students..."):
+                result = score_all_students(model, model_version)
+            st.success(f"Scored {result['students_scored']:,} students in {result['seconds']:.2f}s.")
+            if result['students_skipped']:
+                st.info(f"{result['students_skipped']:,} students were skipped because of incomplete academic data.")
+    model_version = get_current_model_version()
+    if model_version is not None:
+        risk_summary = get_risk_summary(model_version)
+        if not risk_summary.empty:
+            st.dataframe(risk_summary, hide_index=True)
+
+    with st.expander("🗄️ Database Connection Metrics"):
+        st.json(get_connection_pool(DB_NAME).metrics())
+
+    with st.expander("🔐 Login Metrics"):
+        st.json(get_login_service().metrics())
+
+    with st.expander("⏱️ Performance"):
+        display_performance()
 
     st.markdown("---")
     st.subheader("📊 Overall Class Performance Analytics")
     display_analytics()
 
+    st.markdown("---")
+    st.subheader("🔎 Student Browser")
+    display_student_browser()
+
+    st.markdown("---")
+    st.subheader("📥 Export Predictions and Recommendations")
+    display_prediction_export()
+
     st.markdown("---")
     st.subheader("🔮 Predict Individual Student Performance")
     predict_individual_performance()
 
 
+def display_performance():
+    """Shows p50/p95 latency per instrumented span for this session and for the whole server process."""
+    st.caption("Latency of each instrumented step over its most recent "
+               f"{PERF_SAMPLES_PER_SPAN:,} calls. 'rerun' is the whole script run for one interaction.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**This session**")
+        st.dataframe(get_session_perf_stats().summary().round(2), hide_index=True)
+    with col2:
+        st.markdown("**All sessions (this process)**")
+        st.dataframe(get_perf_stats().summary().round(2), hide_index=True)
+    if PERF_LOG_PATH:
+        st.caption(f"Every span is also appended to `{PERF_LOG_PATH}` as JSON lines.")
+    if st.button("Reset performance statistics"):
+        get_session_perf_stats().reset()
+        get_perf_stats().reset()
+
+def display_training_jobs(runner):
+    """Shows recent training jobs, cancel buttons for active ones and the results of the latest successful job."""
+    jobs = get_training_jobs()
+    if jobs.empty:
+        return
+
+    st.button("Refresh Job Status", help="Training runs in the background; refresh to see its progress.")
+    st.dataframe(jobs[['job_id', 'status', 'mode', 'model_version', 'requested_by', 'training_rows', 'accuracy', 'duration_seconds', 'error']], hide_index=True)
+
+    for job_id in jobs.loc[jobs['status'].isin(['queued', 'running']), 'job_id']:
+        if st.button(f"Cancel Job #{job_id}", key=f"cancel_training_job_{job_id}"):
+            if runner.cancel(int(job_id)):
+                st.warning(f"Training job #{job_id} was cancelled. The current model was left unchanged.")
+            st.rerun()
+
+    succeeded = jobs[jobs['status'] == 'succeeded']
+    if not succeeded.empty:
+        latest = succeeded.iloc[0]
+        st.markdown(f"#### Latest Trained Model (job #{latest['job_id']})")
+        st.metric(label="Model Accuracy", value=f"{latest['accuracy']:.2%}")
+
+        st.markdown("#### Confusion Matrix")
+        st.dataframe(pd.DataFrame(json.loads(latest['confusion_matrix']), index=['Actual Fail', 'Actual Pass'], columns=['Predicted Fail', 'Predicted Pass']))
+        st.markdown("#### Classification Report")
+        st.code(latest['classification_report'])
+
+def display_model_versions():
+    """Lists published model versions and lets the admin roll back to an earlier one."""
+    versions = list_model_versions()
+    if versions.empty:
+        return
+
+    with st.expander("🗂️ Model Versions"):
+        current_version = get_current_model_version()
+        st.write(f"Current model version: `{current_version}`")
+        st.dataframe(versions, hide_index=True)
+        selected_version = st.selectbox("Version", versions['version'], key="rollback_version")
+        if st.button("Roll Back to Selected Version", disabled=selected_version == current_version):
+            rollback_model(selected_version)
+            st.success(f"Model version {selected_version} is now current.")
+            st.rerun()
+
+@timed
 def teacher_dashboard():
     """Content for the Teacher dashboard."""
     st.header("Teacher Dashboard")
@@ -356,10 +2022,19 @@ def teacher_dashboard():
     st.subheader("📊 Overall Class Performance Analytics")
     display_analytics()
 
+    st.markdown("---")
+    st.subheader("🔎 Student Browser")
+    display_student_browser()
+
+    st.markdown("---")
+    st.subheader("📥 Export Predictions and Recommendations")
+    display_prediction_export()
+
     st.markdown("---")
     st.subheader("🔮 Predict Individual Student Performance")
     predict_individual_performance()
 
+@timed
 def student_dashboard():
     """Content for the Student dashboard, allowing them to view their own performance."""
     st.header("My Performance Dashboard")
@@ -367,12 +2042,10 @@ def student_dashboard():
 
     student_id_input = st.text_input("Enter Your Student ID:", help="This is the unique ID from the uploaded data.")
     if student_id_input:
-        df_students = get_all_student_data()
-        student_data_row = df_students[df_students['student_id'] == student_id_input]
+        # Indexed lookup of just this student instead of loading the whole table
+        student_data = get_student(student_id_input)
 
-        if not student_data_row.empty:
-            # Convert the single row DataFrame to a dictionary
-            student_data = student_data_row.iloc[0].to_dict()
+        if student_data is not None:
 
             st.subheader(f"Performance Details for {student_data.get('name', 'Unknown Student')}")
             col_info1, col_info2 = st.columns(2)
@@ -412,19 +2085,152 @@ def student_dashboard():
         st.info("Enter your student ID above to see your performance details.")
 
 
-def display_analytics():
-    """Displays various visual analytics charts for class-wide performance."""
-    df_students = get_all_student_data()
+def display_student_browser():
+    """Shows a filterable, paginated table of students; each page is one indexed SQL query, so it scales to millions of rows."""
+    filters = {}
+    col1, col2, col3 = st.columns(3)
+    for col, column in zip(BROWSER_RANGE_FILTERS, (col1, col2, col3)):
+        low, high = ANALYTICS_RANGES[col]
+        with column:
+            selected = st.slider(col.replace('_', ' ').title(), low, high, (low, high), key=f"browser_{col}")
+        # The full range means no filter, so students with a missing value stay visible
+        filters[col] = selected if selected != (low, high) else None
+
+    model_version = get_current_model_version() # From the registry, so it is set and fresh before any model is loaded
+    col1, col2 = st.columns(2)
+    with col1:
+        outcome = st.selectbox("Outcome", ["All", "Pass", "Fail"], key="browser_outcome")
+        filters['outcome'] = {"All": None, "Pass": 1, "Fail": 0}[outcome]
+    with col2:
+        risk = st.selectbox("Risk Category", ["All", "High Risk", "Medium Risk", "Low Risk"], key="browser_risk",
+                            disabled=model_version is None, help="Risk categories come from the last batch scoring of the current model.")
+        filters['risk_category'] = None if risk == "All" else risk
+
+    # cursors[i] is the student_id page i starts after; changing a filter goes back to the first page
+    state_key = (model_version, tuple(sorted(filters.items())))
+    if st.session_state.get('browser_state_key') != state_key:
+        st.session_state.browser_state_key = state_key
+        st.session_state.browser_cursors = [None]
+    cursors = st.session_state.browser_cursors
+
+    page, next_id = get_students_page(filters, model_version=model_version, after_id=cursors[-1])
+    if page.empty:
+        st.info("No students match these filters.")
+        return
+    st.dataframe(page, hide_index=True)
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        st.button("◀ Previous", disabled=len(cursors) == 1, key="browser_previous", on_click=cursors.pop)
+    with col2:
+        st.button("Next ▶", disabled=next_id is None, key="browser_next", on_click=cursors.append, args=(next_id,))
+    with col3:
+        st.caption(f"Page {len(cursors)} · students {page['student_id'].iloc[0]} to {page['student_id'].iloc[-1]}")
+
+def display_prediction_export():
+    """Exports predictions and recommendations for every student to a file in EXPORT_DIR and offers it for download."""
+    model = load_model()
+    if model is None:
+        st.info("The export is available once an administrator has trained the model.")
+        return
+
+    st.write("Predicted outcome, pass probability, risk level and recommendations for every student, scored with the current model.")
+    file_format = st.radio("File format", export_formats(), horizontal=True, key="export_format")
+    if st.button("Prepare Export", help="Scores all students in chunks and writes the report to a file on the server, kept for an hour."):
+        total = sum(get_outcome_counts().values())
+        progress_bar = st.progress(0.0, text="Exporting predictions...")
+
+        def report_progress(students_exported):
+            progress_bar.progress(min(students_exported / total, 1.0) if total else 1.0,
+                                  text=f"{students_exported:,} students exported")
+
+        suffix = '.parquet' if file_format == 'Parquet' else '.csv'
+        sweep_exports()
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='student_predictions_', suffix=suffix, dir=EXPORT_DIR)
+        os.close(fd)
+        try:
+            stats = export_predictions(model, path, file_format, progress_callback=report_progress)
+        except Exception as e:
+            os.remove(path)
+            progress_bar.empty()
+            st.error(f"An error occurred while exporting predictions: {e}")
+            return
+        progress_bar.empty()
+        previous = st.session_state.get('prediction_export')
+        if previous is not None and os.path.exists(previous['path']):
+            os.remove(previous['path']) # Only the latest export of this session is kept on disk
+        st.session_state.prediction_export = {'path': path, 'suffix': suffix, 'stats': stats}
+
+    export = st.session_state.get('prediction_export')
+    if export is None or not os.path.exists(export['path']):
+        return
+    stats = export['stats']
+    st.caption(f"{stats['students_exported']:,} students exported in {stats['seconds']:.1f}s ({stats['bytes'] / 1e6:.1f} MB). "
+               f"{stats['students_skipped']:,} students were skipped because of incomplete academic data.")
+
+    def read_export():
+        with open(export['path'], 'rb') as f:
+            return f.read()
 
-    if df_students.empty:
+    # A callable is only run when the button is clicked, so the file is not re-read into memory on every rerun
+    st.download_button("Download Export", data=read_export, file_name=f"student_predictions{export['suffix']}",
+                       mime='application/octet-stream' if export['suffix'] == '.parquet' else 'text/csv', on_click='ignore')
+
+@timed
+def display_analytics():
+    """Displays various visual analytics charts for class-wide performance, built from the precomputed aggregates."""
+    if not get_outcome_counts():
         st.info("No student data available for analytics. Please upload data via the Admin dashboard.")
         return
 
+    # Charts are rendered once per data version and shared by every session as PNG bytes
+    charts = render_analytics_charts(DB_NAME, get_data_version())
+
     st.markdown("---") # Separator
 
-    # Performance Distribution (Pass/Fail)
     st.subheader("Performance Distribution (Pass/Fail)")
-    outcome_counts = df_students[TARGET].map({1: 'Pass', 0: 'Fail'}).value_counts()
+    st.image(charts['outcomes'])
+
+    st.subheader("Marks Distribution")
+    st.image(charts['marks'])
+
+    st.subheader("Attendance vs. Final Marks")
+    st.image(charts['attendance_vs_final'])
+
+    st.subheader("Previous GPA Distribution")
+    st.image(charts['gpa'])
+
+    # Summary Statistics
+    st.subheader("Summary Statistics")
+    st.dataframe(get_summary_stats().style.format(precision=2))
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner="Rendering charts...")
+@timed
+def render_analytics_charts(db_name, data_version):
+    """
+    Renders all analytics charts to PNG bytes. db_name and data_version only serve as the cache key:
+    a new upload bumps the data version, so the charts are re-rendered once and then served from memory.
+    """
+    return {
+        'outcomes': _figure_to_png(_outcome_chart()),
+        'marks': _figure_to_png(_marks_chart()),
+        'attendance_vs_final': _figure_to_png(_attendance_vs_final_chart()),
+        'gpa': _figure_to_png(_gpa_chart()),
+    }
+
+def _figure_to_png(fig):
+    """Serializes a Matplotlib figure to PNG bytes and closes it so long-running servers do not accumulate figures."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=CHART_DPI, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+def _outcome_chart():
+    """Pass/Fail donut chart."""
+    outcome_counts = pd.Series(get_outcome_counts()).rename({1: 'Pass', 0: 'Fail'}).sort_values(ascending=False)
     fig1, ax1 = plt.subplots(figsize=(6, 6))
     ax1.pie(outcome_counts, labels=outcome_counts.index, autopct='%1.1f%%', startangle=90,
             colors=['#66b3ff','#ff9999'], pctdistance=0.85, wedgeprops=dict(width=0.3))
@@ -433,41 +2239,101 @@ def display_analytics():
     centre_circle = plt.Circle((0,0),0.70,fc='white')
     fig1.gca().add_artist(centre_circle)
     ax1.axis('equal') # Equal aspect ratio ensures that pie is drawn as a circle.
-    st.pyplot(fig1)
+    return fig1
 
-    # Marks Distribution
-    st.subheader("Marks Distribution")
+def _marks_chart():
+    """Mid-term and final-term marks distributions side by side."""
     fig2, (ax_mid, ax_final) = plt.subplots(1, 2, figsize=(15, 6))
-    sns.histplot(df_students['mid_term_marks'], kde=True, ax=ax_mid, color='skyblue', bins=10)
+    plot_histogram('mid_term_marks', ax=ax_mid, color='skyblue')
     ax_mid.set_title('Mid-Term Marks Distribution')
     ax_mid.set_xlabel('Marks')
     ax_mid.set_ylabel('Number of Students')
 
-    sns.histplot(df_students['final_term_marks'], kde=True, ax=ax_final, color='lightcoral', bins=10)
+    plot_histogram('final_term_marks', ax=ax_final, color='lightcoral')
     ax_final.set_title('Final-Term Marks Distribution')
     ax_final.set_xlabel('Marks')
     ax_final.set_ylabel('Number of Students')
-    st.pyplot(fig2)
-
-    # Attendance vs. Final Marks Scatter Plot
-    st.subheader("Attendance vs. Final Marks")
+    return fig2
+
+def _attendance_vs_final_chart():
+    """Attendance vs. Final Marks by outcome; switches to a density or sampled view above SCATTER_MAX_POINTS students."""
+    total_students = sum(get_outcome_counts().values())
+    if total_students > SCATTER_MAX_POINTS:
+        if SCATTER_LARGE_MODE == 'sample':
+            return _attendance_vs_final_scatter(sample_scatter_data(SCATTER_MAX_POINTS / total_students), point_size=20,
+                                                title=f'Attendance vs. Final Marks by Outcome (sample of {total_students:,} students)')
+        return _attendance_vs_final_density()
+    return _attendance_vs_final_scatter(get_scatter_data())
+
+def _attendance_vs_final_scatter(df_scatter, point_size=100, title='Attendance vs. Final Marks by Outcome'):
+    """Scatter plot of one point per student, colored by outcome."""
     fig3, ax3 = plt.subplots(figsize=(10, 7))
-    sns.scatterplot(x='attendance', y='final_term_marks', hue=TARGET, data=df_students, ax=ax3,
-                    palette={1: 'green', 0: 'red'}, s=100, alpha=0.7)
-    ax3.set_title('Attendance vs. Final Marks by Outcome')
+    sns.scatterplot(x='attendance', y='final_term_marks', hue=TARGET, data=df_scatter, ax=ax3,
+                    palette={1: 'green', 0: 'red'}, s=point_size, alpha=0.7)
+    ax3.set_title(title)
     ax3.set_xlabel('Attendance (%)')
     ax3.set_ylabel('Final Term Marks')
     ax3.legend(title='Outcome', labels=['Fail', 'Pass'])
-    st.pyplot(fig3)
-
-    # Previous GPA Distribution
-    st.subheader("Previous GPA Distribution")
+    return fig3
+
+def _attendance_vs_final_density():
+    """2D binned student counts of attendance vs. final marks, one panel per outcome."""
+    x_edges = np.linspace(*ANALYTICS_RANGES['attendance'], SCATTER_DENSITY_BINS + 1)
+    y_edges = np.linspace(*ANALYTICS_RANGES['final_term_marks'], SCATTER_DENSITY_BINS + 1)
+    counts = compute_scatter_density(x_edges, y_edges)
+
+    fig3, axes = plt.subplots(1, 2, figsize=(15, 7), sharey=True)
+    for ax, outcome, label, cmap in ((axes[0], 0, 'Fail', 'Reds'), (axes[1], 1, 'Pass', 'Greens')):
+        grid = np.ma.masked_equal(counts[outcome].T, 0) # Leave empty bins blank
+        mesh = ax.pcolormesh(x_edges, y_edges, grid, cmap=cmap, norm=LogNorm() if grid.count() else None)
+        fig3.colorbar(mesh, ax=ax, label='Number of Students')
+        ax.set_title(f'{label} ({int(counts[outcome].sum()):,} students)')
+        ax.set_xlabel('Attendance (%)')
+    axes[0].set_ylabel('Final Term Marks')
+    fig3.suptitle('Attendance vs. Final Marks by Outcome (student density)')
+    return fig3
+
+def _iter_scatter_chunks():
+    """Yields the scatter plot columns of the students table in CSV_CHUNK_SIZE chunks."""
+    with db_connection() as conn:
+        yield from pd.read_sql_query(f"SELECT attendance, final_term_marks, {TARGET} FROM students", conn, chunksize=CSV_CHUNK_SIZE)
+
+def compute_scatter_density(x_edges, y_edges):
+    """Counts students per (attendance, final marks) bin for each outcome, streaming the table so memory stays bounded."""
+    counts = {outcome: np.zeros((len(x_edges) - 1, len(y_edges) - 1)) for outcome in (0, 1)}
+    for chunk in _iter_scatter_chunks():
+        # Clip into range so out-of-range values land in the edge bins, as in the 1D histograms
+        x = chunk['attendance'].clip(x_edges[0], x_edges[-1])
+        y = chunk['final_term_marks'].clip(y_edges[0], y_edges[-1])
+        for outcome in counts:
+            selected = (chunk[TARGET] == outcome) & x.notna() & y.notna()
+            counts[outcome] += np.histogram2d(x[selected], y[selected], bins=(x_edges, y_edges))[0]
+    return counts
+
+def sample_scatter_data(fraction):
+    """Draws the same fraction of students from each outcome, preserving the pass/fail ratio of the full table."""
+    samples = [chunk.groupby(TARGET, group_keys=False).sample(frac=fraction, random_state=42) for chunk in _iter_scatter_chunks()]
+    return pd.concat(samples, ignore_index=True) if samples else pd.DataFrame(columns=['attendance', 'final_term_marks', TARGET])
+
+def _gpa_chart():
+    """Previous GPA distribution."""
     fig4, ax4 = plt.subplots(figsize=(8, 6))
-    sns.histplot(df_students['previous_gpa'], kde=True, ax=ax4, color='lightgreen', bins=10)
+    plot_histogram('previous_gpa', ax=ax4, color='lightgreen')
     ax4.set_title('Previous GPA Distribution')
     ax4.set_xlabel('GPA')
     ax4.set_ylabel('Number of Students')
-    st.pyplot(fig4)
+    return fig4
+
+def plot_histogram(col, ax, color):
+    """Draws the precomputed histogram for col; the KDE is fitted to the bin counts rather than to every row."""
+    edges, counts = get_histogram(col)
+    centers = (edges[:-1] + edges[1:]) / 2
+    sns.histplot(x=centers, weights=counts, bins=edges.tolist(), kde=bool(counts.sum() > 0), ax=ax, color=color)
+
+def get_scatter_data():
+    """Retrieves only the columns needed for the attendance vs. final marks scatter plot."""
+    with db_connection() as conn:
+        return pd.read_sql_query(f"SELECT attendance, final_term_marks, {TARGET} FROM students", conn)
 
 
 def predict_individual_performance():
@@ -517,4 +2383,9 @@ def predict_individual_performance():
                 st.error("Prediction failed. Please ensure the model is trained and input values are valid.")
 
 if __name__ == "__main__":
-    main()
+    # `python app.py --train-job JOB_ID DB_NAME MODEL_REGISTRY_DIR` is how TrainingJobRunner starts a worker process
+    if len(sys.argv) == 5 and sys.argv[1] == TRAINING_JOB_FLAG:
+        DB_NAME, MODEL_REGISTRY_DIR = sys.argv[3], sys.argv[4]
+        run_training_job(int(sys.argv[2]))
+    else:
+        main()
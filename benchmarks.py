@@ -0,0 +1,281 @@
+"""
+Benchmarks for the Student Academic Performance Predictor.
+
+Usage:
+    python benchmarks.py suite [--sizes N ...] [--label NAME] [--output PATH]
+    python benchmarks.py compare BASELINE.json CANDIDATE.json [--threshold 0.2]
+    python benchmarks.py inference [--rows N] [--repeat R]
+
+The suite runs each data-access, model and rendering function against a fresh database of synthetic students at
+every size, and writes latency, throughput and peak memory (tracemalloc) to a JSON results file. compare exits
+with status 1 when the candidate is slower or uses more memory than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import app
+from streamlit import config as st_config, logger as st_logger
+
+# Calling UI functions without a running app logs a warning per element. Load the config first, since
+# loading it resets the log level.
+st_config.get_option('logger.level')
+st_logger.set_log_level('error')
+
+RESULTS_DIR = 'benchmark_results'
+DEFAULT_SIZES = [1000, 10000, 100000]
+GENERATOR_CHUNK_SIZE = 100000 # Synthetic rows generated and inserted per batch, so millions of rows fit in memory
+
+
+def synthetic_features(n, seed=42):
+    """Generates n rows of plausible FEATURES values and a Pass/Fail outcome."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'attendance': rng.uniform(40, 100, n),
+        'mid_term_marks': rng.uniform(0, 100, n),
+        'previous_gpa': rng.uniform(0, 4, n),
+    })
+    score = 0.5 * df['mid_term_marks'] + 0.4 * df['attendance'] + 5 * df['previous_gpa'] - 10 + rng.normal(0, 8, n)
+    df[app.TARGET] = (score >= 60).astype(int)
+    return df
+
+
+def synthetic_students(n, seed=42, chunk_size=GENERATOR_CHUNK_SIZE):
+    """Yields n synthetic student records with every column the app stores, chunk_size rows at a time."""
+    for offset in range(0, n, chunk_size):
+        size = min(chunk_size, n - offset)
+        df = synthetic_features(size, seed=seed + offset)
+        rng = np.random.default_rng(seed + offset + 1)
+        df.insert(0, 'student_id', [f"S{i:08d}" for i in range(offset, offset + size)])
+        df.insert(1, 'name', [f"Student {i}" for i in range(offset, offset + size)])
+        df['final_term_marks'] = np.clip(0.5 * df['mid_term_marks'] + 0.4 * df['attendance'] + 5 * df['previous_gpa'] - 10
+                                         + rng.normal(0, 8, size), 0, 100)
+        df[app.TARGET] = (df['final_term_marks'] >= 60).astype(int)
+        yield df[['student_id', 'name', 'attendance', 'mid_term_marks', 'final_term_marks', 'previous_gpa', app.TARGET]]
+
+
+def peak_memory(func):
+    """Calls func once under tracemalloc and returns (peak traced memory in MB, result)."""
+    tracemalloc.start()
+    try:
+        result = func()
+        return tracemalloc.get_traced_memory()[1] / 1e6, result
+    finally:
+        tracemalloc.stop()
+
+
+def measure(func, repeat=1, track_memory=True):
+    """Returns (mean seconds per call over repeat calls, peak traced memory in MB of one extra call or None, last result)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    seconds = (time.perf_counter() - start) / repeat
+
+    peak_mb = None
+    if track_memory:
+        # Measured in a separate call so tracemalloc's overhead does not distort the timings
+        peak_mb, result = peak_memory(func)
+    return seconds, peak_mb, result
+
+
+def _use_fresh_environment(directory):
+    """Points the app at an empty database and model registry in directory and clears process-wide caches."""
+    app.DB_NAME = os.path.join(directory, 'benchmark.db')
+    app.MODEL_REGISTRY_DIR = os.path.join(directory, 'model_registry')
+    app.MODEL_PATH = os.path.join(directory, 'legacy_model.pkl')
+    app.get_model_cache.clear()
+    app.get_student_cache.clear()
+    app.render_analytics_charts.clear()
+    app.init_db()
+
+
+def bench_size(n, track_memory=True):
+    """Runs every benchmarked function against a fresh database of n students and returns one result row per function."""
+    results = []
+
+    def record(function, seconds, peak_mb, rows=None):
+        results.append({
+            'function': function,
+            'rows': n,
+            'seconds': seconds,
+            'throughput_rows_per_sec': rows / seconds if rows and seconds else None,
+            'peak_memory_mb': peak_mb,
+        })
+        print(f"  {function:<26} {seconds * 1000:>12.2f} ms" + (f"  {peak_mb:>9.1f} MB" if peak_mb is not None else ""))
+
+    with tempfile.TemporaryDirectory() as directory:
+        # add_student_data: bulk load the whole table in batches, as the streaming CSV upload does
+        def load_all():
+            for chunk in synthetic_students(n):
+                app.add_student_data(chunk)
+        peak_mb = None
+        if track_memory:
+            # Memory is measured on its own fresh database, so it covers the insert path rather than a no-op re-upload
+            memory_directory = os.path.join(directory, 'memory')
+            os.makedirs(memory_directory)
+            _use_fresh_environment(memory_directory)
+            peak_mb, _ = peak_memory(load_all)
+        _use_fresh_environment(directory)
+        seconds, _, _ = measure(load_all, track_memory=False)
+        record('add_student_data', seconds, peak_mb, rows=n)
+
+        seconds, peak_mb, _ = measure(app.get_all_student_data, track_memory=track_memory)
+        record('get_all_student_data', seconds, peak_mb, rows=n)
+
+        # Full refit, as a training job runs it
+        seconds, peak_mb, (model, _, _, _, _, trained_through) = measure(app.train_model_streaming, track_memory=track_memory)
+        record('train_model_streaming', seconds, peak_mb, rows=n)
+        app.save_model(model)
+
+        # Incremental update after 1% of the students changed, as a training job runs it
+        for chunk in synthetic_students(max(1, n // 100), seed=7):
+            app.add_student_data(chunk)
+        def update_incrementally():
+            return app.update_model_incrementally(model, app.get_changed_training_rows(trained_through))
+        seconds, peak_mb, _ = measure(update_incrementally, track_memory=track_memory)
+        record('update_model_incrementally', seconds, peak_mb, rows=max(1, n // 100))
+
+        data = {'attendance': 82.5, 'mid_term_marks': 61.0, 'previous_gpa': 2.9}
+        seconds, peak_mb, _ = measure(lambda: app.predict_performance(model, data), repeat=1000, track_memory=track_memory)
+        record('predict_performance', seconds, peak_mb)
+
+        seconds, peak_mb, _ = measure(lambda: app.get_user('admin', 'adminpass'), repeat=3, track_memory=track_memory)
+        record('get_user', seconds, peak_mb)
+
+        # Uncached render: what the first session pays after each upload
+        def render_uncached():
+            app.render_analytics_charts.clear()
+            app.display_analytics()
+        seconds, peak_mb, _ = measure(render_uncached, track_memory=track_memory)
+        record('display_analytics', seconds, peak_mb, rows=n)
+
+        # Cached render: what every other session pays until the next upload
+        seconds, peak_mb, _ = measure(app.display_analytics, repeat=10, track_memory=track_memory)
+        record('display_analytics_cached', seconds, peak_mb)
+
+        app.get_connection_pool.clear() # Release pooled connections before the directory is deleted
+    return results
+
+
+def run_suite(sizes, label, output, track_memory=True):
+    """Benchmarks every size and writes the results file. Returns the results document."""
+    document = {
+        'label': label,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'results': [],
+    }
+    for n in sizes:
+        print(f"{n:,} students")
+        document['results'].extend(bench_size(n, track_memory=track_memory))
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+    return document
+
+
+def compare_results(baseline_path, candidate_path, threshold=0.2):
+    """
+    Compares two results files function by function and size by size. Returns the comparison table and
+    whether any latency or peak memory regressed by more than threshold (e.g. 0.2 = 20%).
+    """
+    frames = []
+    for path in (baseline_path, candidate_path):
+        with open(path) as f:
+            frame = pd.DataFrame(json.load(f)['results']).set_index(['function', 'rows'])
+            frames.append(frame[['seconds', 'peak_memory_mb']].astype(float)) # Memory is null for --no-memory runs
+    baseline, candidate = frames
+    table = baseline.join(candidate, lsuffix='_baseline', rsuffix='_candidate', how='inner')
+    table['time_ratio'] = table['seconds_candidate'] / table['seconds_baseline']
+    table['memory_ratio'] = table['peak_memory_mb_candidate'] / table['peak_memory_mb_baseline']
+    table['regression'] = (table['time_ratio'] > 1 + threshold) | (table['memory_ratio'] > 1 + threshold)
+    return table, bool(table['regression'].any())
+
+
+def _time_per_call(func, repeat):
+    """Returns the mean seconds per call of func over repeat calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_inference(rows=100000, repeat=2000):
+    """Compares the sklearn and NumPy prediction paths for single rows and a batch, and checks their outputs match."""
+    train = synthetic_features(5000)
+    model = app.LogisticRegression(max_iter=1000, random_state=42).fit(train[app.FEATURES], train[app.TARGET])
+    app.get_model_cache().store('benchmark', model) # So predict_performance reuses one scorer, as it does in the app
+    scorer = app.get_scorer(model)
+
+    # Single row, as in predict_individual_performance and student_dashboard
+    data = {'attendance': 82.5, 'mid_term_marks': 61.0, 'previous_gpa': 2.9}
+    single_sklearn = _time_per_call(lambda: app._predict_performance_sklearn(model, data), repeat)
+    single_numpy = _time_per_call(lambda: app.predict_performance(model, data), repeat)
+    single_match = app._predict_performance_sklearn(model, data) == app.predict_performance(model, data)
+
+    # Batch, as in score_all_students
+    batch = synthetic_features(rows, seed=7)[app.FEATURES]
+    X = batch.to_numpy(dtype=float)
+    batch_repeat = max(1, repeat // 200)
+    batch_sklearn = _time_per_call(lambda: model.predict_proba(batch)[:, 1], batch_repeat)
+    batch_numpy = _time_per_call(lambda: scorer.predict_proba(X), batch_repeat)
+    batch_match = (np.array_equal(model.predict_proba(batch)[:, 1], scorer.predict_proba(X)) and
+                   np.array_equal(model.predict(batch), scorer.predict(X)))
+
+    results = pd.DataFrame([
+        {'path': 'single row', 'sklearn_ms': single_sklearn * 1000, 'numpy_ms': single_numpy * 1000,
+         'speedup': single_sklearn / single_numpy, 'identical': bool(single_match)},
+        {'path': f'batch of {rows:,}', 'sklearn_ms': batch_sklearn * 1000, 'numpy_ms': batch_numpy * 1000,
+         'speedup': batch_sklearn / batch_numpy, 'identical': bool(batch_match)},
+    ])
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    suite = subparsers.add_parser('suite', help="Benchmark the app's functions at several data sizes.")
+    suite.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Numbers of students to benchmark.")
+    suite.add_argument('--label', default=time.strftime('%Y%m%d-%H%M%S'), help="Name of this run.")
+    suite.add_argument('--output', help=f"Results file (default: {RESULTS_DIR}/<label>.json).")
+    suite.add_argument('--no-memory', action='store_true', help="Skip the peak memory measurements.")
+
+    compare = subparsers.add_parser('compare', help="Compare two results files and fail on regressions.")
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown or memory growth (0.2 = 20%%).")
+
+    inference = subparsers.add_parser('inference', help="Compare sklearn and NumPy prediction paths.")
+    inference.add_argument('--rows', type=int, default=100000, help="Rows in the batch scoring comparison.")
+    inference.add_argument('--repeat', type=int, default=2000, help="Single-row predictions to time per path.")
+
+    args = parser.parse_args()
+    if args.command == 'suite':
+        output = args.output or os.path.join(RESULTS_DIR, f"{args.label}.json")
+        run_suite(args.sizes, args.label, output, track_memory=not args.no_memory)
+    elif args.command == 'compare':
+        table, regressed = compare_results(args.baseline, args.candidate, args.threshold)
+        print(table.to_string(float_format=lambda v: f"{v:.4g}"))
+        if regressed:
+            print(f"Regression: at least one function is more than {args.threshold:.0%} slower or larger than the baseline.")
+            sys.exit(1)
+    elif args.command == 'inference':
+        bench_inference(rows=args.rows, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Points the app at an empty database and model registry in tmp_path."""
+    monkeypatch.setattr(app, 'DB_NAME', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(app, 'MODEL_REGISTRY_DIR', str(tmp_path / 'model_registry'))
+    monkeypatch.setattr(app, 'MODEL_PATH', str(tmp_path / 'legacy_model.pkl'))
+    monkeypatch.setattr(app, 'DEFAULT_USERS', []) # Skip bcrypt hashing, which no test here needs
+    app.get_model_cache.clear()
+    app.get_student_cache.clear()
+    app.init_db()
+    yield
+    app.get_connection_pool.clear()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+def students(ids, attendance=75.0, final_term_marks=70.0):
+    return pd.DataFrame({
+        'student_id': ids,
+        'name': [f"Student {i}" for i in ids],
+        'attendance': attendance,
+        'mid_term_marks': 60.0,
+        'final_term_marks': final_term_marks,
+        'previous_gpa': 3.0,
+        'outcome': int(final_term_marks >= 60),
+    })
+
+
+def analytics_snapshot():
+    return repr((app.get_outcome_counts(), [app.get_histogram(col) for col in app.ANALYTICS_RANGES],
+                 app.get_summary_stats().round(9)))
+
+
+def assert_analytics_match_table():
+    """The incrementally maintained aggregates must equal a rebuild from the students table."""
+    incremental = analytics_snapshot()
+    with app.db_transaction() as conn:
+        app.rebuild_analytics(conn)
+    assert incremental == analytics_snapshot()
+
+
+def row_versions():
+    with app.db_connection() as conn:
+        return dict(conn.execute("SELECT student_id, row_version FROM students").fetchall())
+
+
+def test_counts_and_row_versions(fresh_db):
+    assert app.add_student_data(students(['s1', 's2', 's3'])) == {'inserted': 3, 'updated': 0, 'unchanged': 0}
+    assert app.get_data_version() == 1
+
+    # Identical re-upload writes nothing and does not bump the data version
+    assert app.add_student_data(students(['s1', 's2', 's3'])) == {'inserted': 0, 'updated': 0, 'unchanged': 3}
+    assert app.get_data_version() == 1
+
+    changed = pd.concat([students(['s1', 's2']), students(['s3'], attendance=50.0), students(['s4'])])
+    assert app.add_student_data(changed) == {'inserted': 1, 'updated': 1, 'unchanged': 2}
+    assert row_versions() == {'s1': 1, 's2': 1, 's3': 2, 's4': 2}
+    assert_analytics_match_table()
+
+
+def test_integer_ids_update_existing_rows(fresh_db):
+    app.add_student_data(students(['1', '2', '3']))
+    counts = app.add_student_data(students([1, 2], final_term_marks=40.0))
+    assert counts == {'inserted': 0, 'updated': 2, 'unchanged': 0}
+    assert app.get_outcome_counts() == {0: 2, 1: 1}
+    assert_analytics_match_table()
+
+
+def test_partial_columns_keep_stored_values(fresh_db):
+    app.add_student_data(students(['s1', 's2']))
+    partial = pd.DataFrame({'student_id': ['s1', 'n1'], 'final_term_marks': [95.0, np.nan]})
+    assert app.add_student_data(partial) == {'inserted': 1, 'updated': 1, 'unchanged': 0}
+    assert app.get_student('s1')['attendance'] == 75.0
+    assert app.get_student('s1')['final_term_marks'] == 95.0
+    assert_analytics_match_table()
+
+
+def test_null_values_and_duplicates(fresh_db):
+    app.add_student_data(students(['s1', 's2']))
+    update = pd.concat([students(['s1'], attendance=10.0), students(['s1'], attendance=np.nan)])
+    assert app.add_student_data(update) == {'inserted': 0, 'updated': 1, 'unchanged': 0}
+    assert np.isnan(app.get_student('s1')['attendance'])
+    # NULL compared with NULL is unchanged
+    assert app.add_student_data(students(['s1'], attendance=np.nan)) == {'inserted': 0, 'updated': 0, 'unchanged': 1}
+    assert_analytics_match_table()
+
+
+def test_changed_rows_are_invalidated_in_the_student_cache(fresh_db):
+    app.add_student_data(students(['s1', 's2']))
+    assert app.get_student('s1')['attendance'] == 75.0
+    app.add_student_data(students(['s1'], attendance=90.0))
+    assert app.get_student('s1')['attendance'] == 90.0
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_upserts_keep_analytics_exact(fresh_db, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(5):
+        ids = [f"s{i}" for i in rng.choice(200, size=80, replace=False)]
+        batch = pd.DataFrame({
+            'student_id': ids,
+            'name': 'x',
+            'attendance': rng.choice([np.nan, 55.0, 80.0, 99.5], size=80),
+            'mid_term_marks': rng.uniform(0, 100, 80).round(1),
+            'final_term_marks': rng.choice([30.0, 65.0, 100.0], size=80),
+            'previous_gpa': rng.uniform(0, 4, 80).round(2),
+        })
+        batch['outcome'] = (batch['final_term_marks'] >= 60).astype(int)
+        app.add_student_data(batch)
+        assert_analytics_match_table()
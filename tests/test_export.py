@@ -0,0 +1,58 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+import app
+
+
+def test_sweep_exports_removes_only_old_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'EXPORT_DIR', str(tmp_path))
+    old, recent = tmp_path / 'old.csv', tmp_path / 'recent.csv'
+    old.write_text('x')
+    recent.write_text('x')
+    stale = time.time() - app.EXPORT_MAX_AGE - 10
+    os.utime(old, (stale, stale))
+    app.sweep_exports()
+    assert sorted(os.listdir(tmp_path)) == ['recent.csv']
+
+
+def test_export_matches_single_student_predictions(fresh_db, tmp_path):
+    n = 300
+    df = pd.DataFrame({
+        'student_id': [f"s{i:03d}" for i in range(n)],
+        'name': 'x',
+        'attendance': [50 + i % 50 for i in range(n)],
+        'mid_term_marks': [(i * 7) % 100 for i in range(n)],
+        'final_term_marks': [(i * 13) % 100 for i in range(n)],
+        'previous_gpa': [(i % 40) / 10 for i in range(n)],
+    })
+    df['outcome'] = (df['final_term_marks'] >= 60).astype(int)
+    app.add_student_data(df)
+    model = app.train_model_streaming()[0]
+
+    path = str(tmp_path / 'export.csv')
+    stats = app.export_predictions(model, path, chunk_size=70)
+    assert stats['students_exported'] == n
+    export = pd.read_csv(path)
+    for row in export.to_dict('records'):
+        prediction, probability = app.predict_performance(model, row)
+        assert row['predicted_outcome'] == ("Pass" if prediction == 1 else "Fail")
+        assert abs(row['pass_probability'] - probability) < 1e-12
+        assert row['risk_category'] == app.get_risk_category(probability)
+        assert row['recommendations'] == " ".join(app.get_recommendations(row, row['risk_category']))
+
+
+def test_empty_parquet_export_keeps_the_column_types(fresh_db, tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'export.parquet')
+    model = LogisticRegression().fit([[60.0, 40.0, 2.0], [95.0, 85.0, 3.8]], [0, 1])
+    stats = app.export_predictions(model, path, file_format='Parquet')
+    assert stats['students_exported'] == 0
+    export = pd.read_parquet(path)
+    assert export.empty
+    assert list(export.columns)[-4:] == ['predicted_outcome', 'pass_probability', 'risk_category', 'recommendations']
+    assert export['pass_probability'].dtype == 'float64'
+    assert pd.api.types.is_string_dtype(export['student_id'])
@@ -0,0 +1,45 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+import app
+
+
+def fitted_model():
+    X = np.array([[60.0, 40.0, 2.0], [90.0, 80.0, 3.5], [50.0, 30.0, 1.5], [95.0, 85.0, 3.8]])
+    return LogisticRegression().fit(X, [0, 1, 0, 1])
+
+
+def test_versions_are_numbered_after_the_highest_remaining_one(fresh_db):
+    model = fitted_model()
+    assert [app.save_model(model) for _ in range(3)] == ['v000001', 'v000002', 'v000003']
+    shutil.rmtree(os.path.join(app.MODEL_REGISTRY_DIR, 'versions', 'v000002'))
+    assert app.save_model(model) == 'v000004'
+    assert app.get_current_model_version() == 'v000004'
+
+
+def test_scores_are_stored_under_the_version_of_the_scoring_model(fresh_db):
+    app.add_student_data(pd.DataFrame({'student_id': ['s1', 's2'], 'name': 'x', 'attendance': [60.0, 95.0],
+                                       'mid_term_marks': [40.0, 85.0], 'final_term_marks': [40.0, 90.0],
+                                       'previous_gpa': [2.0, 3.8], 'outcome': [0, 1]}))
+    first = fitted_model()
+    app.save_model(first)
+    model, version = app.load_model_and_version()
+    assert (model, version) == (first, 'v000001')
+
+    app.save_model(fitted_model()) # Another session publishes a newer model before scoring runs
+    app.score_all_students(model, version)
+    with app.db_connection() as conn:
+        assert conn.execute("SELECT DISTINCT model_version FROM predictions").fetchall() == [('v000001',)]
+
+
+def test_batch_scoring_matches_predict_performance_when_the_probability_rounds_to_one_half(fresh_db):
+    model = fitted_model()
+    model.coef_, model.intercept_ = np.zeros_like(model.coef_), np.array([1e-20]) # expit(1e-20) == 0.5 exactly
+    student = {'attendance': 60.0, 'mid_term_marks': 40.0, 'previous_gpa': 2.0}
+    predictions, probabilities, _ = app.score_features(model, pd.DataFrame([student]))
+    assert probabilities[0] == 0.5
+    assert predictions[0] == app.predict_performance(model, student)[0] == 1
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+def students(n):
+    return pd.DataFrame({
+        'student_id': [f"s{i}" for i in range(n)],
+        'name': 'x',
+        'attendance': np.linspace(50, 100, n),
+        'mid_term_marks': np.linspace(20, 95, n),
+        'final_term_marks': np.linspace(30, 95, n),
+        'previous_gpa': np.linspace(1.5, 4.0, n),
+        'outcome': (np.linspace(30, 95, n) >= 60).astype(int),
+    })
+
+
+@pytest.mark.parametrize('split', ['all_train', 'all_test'])
+def test_streaming_training_with_a_one_sided_split(fresh_db, monkeypatch, split):
+    app.add_student_data(students(6))
+    monkeypatch.setattr(app, 'TEST_SPLIT_PERCENT', 0 if split == 'all_train' else 100)
+    model, accuracy, conf_matrix, class_report, training_rows, _ = app.train_model_streaming()
+    assert training_rows == 6
+    assert 0.0 <= accuracy <= 1.0
+    assert conf_matrix.sum() == 6
+    assert class_report.startswith("Too few students")
+
+
+def test_streaming_training_holds_out_a_test_set(fresh_db):
+    app.add_student_data(students(400))
+    model, accuracy, conf_matrix, class_report, training_rows, _ = app.train_model_streaming()
+    assert training_rows == 400
+    assert 0 < conf_matrix.sum() < 400
+    assert not class_report.startswith("Too few students")
+
+
+def test_poll_fails_running_jobs_whose_worker_is_gone(fresh_db):
+    worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+    worker.wait()
+    with app.db_transaction() as conn:
+        job_id = conn.execute("INSERT INTO training_jobs (status, requested_mode, created_at, started_at, pid) VALUES ('running', 'full', ?, ?, ?)",
+                              (time.time(), time.time(), worker.pid)).lastrowid
+    staging_dir = app._registry_path('versions', f".staging-{worker.pid}-1")
+    os.makedirs(staging_dir)
+    open(os.path.join(staging_dir, 'parameters.npy'), 'wb').close()
+
+    app.TrainingJobRunner(max_workers=0).poll()
+    with app.db_connection() as conn:
+        status, error = conn.execute("SELECT status, error FROM training_jobs WHERE job_id=?", (job_id,)).fetchone()
+    assert status == 'failed' and error
+    assert not os.path.exists(staging_dir)